@@ -1,10 +1,20 @@
-import networkx as nx
-import matplotlib.pyplot as plt
+import argparse
 import heapq
+import sys
+from array import array
+from collections import namedtuple
+from multiprocessing import Pool
 from pathlib import Path
 
+from monipolku import compact_hops, csr_adjacency, ecmp_dijkstra, hop_list
+from valimuisti import arrays_key, cache_path, load_arrays, save_arrays
+
 polku = Path.home() / "reititystaulut.txt"
 
+# Tiedosto kirjoitetaan suurina puskuroituina erinä; konsoliin tulostetaan täydet taulut vain pienille verkoille
+WRITE_BUFFER = 1 << 20
+ECHO_LIMIT = 100
+
 
 def dijkstra(graph, source):
     dist = {node: float('inf') for node in graph.nodes()}
@@ -27,6 +37,239 @@ def dijkstra(graph, source):
 
     return dist, prev
 
+# Taulukkopohjainen (CSR) esitys verkosta: solmut kokonaislukutunnisteina 0..n-1,
+# naapurit solmulle i ovat targets[offsets[i]:offsets[i+1]] ja painot vastaavasti weights-taulukossa
+CSRGraph = namedtuple('CSRGraph', ['nodes', 'index', 'offsets', 'targets', 'weights'])
+
+def _weight_array(weight_list):
+    if all(isinstance(w, int) for w in weight_list):
+        return array('q', weight_list)
+    if all(isinstance(w, float) for w in weight_list):
+        return array('d', weight_list)
+    # Sekalaiset painotyypit pidetään listana, jotta etäisyyksien tulostus ei muutu
+    return weight_list
+
+def build_csr(graph):
+    nodes = list(graph.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    offsets = array('q', [0])
+    targets = array('q')
+    weight_list = []
+    for u in nodes:
+        for v in graph.neighbors(u):
+            targets.append(index[v])
+            weight_list.append(graph[u][v]['weight'])
+        offsets.append(len(targets))
+    return CSRGraph(nodes, index, offsets, targets, _weight_array(weight_list))
+
+# Sama CSR suoraan linkkilistasta [(u, v, paino), ...] ilman networkx-verkkoa. Naapurijärjestys
+# vastaa build_csr(G):tä, kun G on rakennettu add_nodes_from(range(n)) + add_edge linkkijärjestyksessä.
+def csr_from_links(num_nodes, links):
+    adjacency = [{} for _ in range(num_nodes)]
+    for u, v, w in links:
+        adjacency[u][v] = w
+        adjacency[v][u] = w
+    offsets = array('q', [0])
+    targets = array('q')
+    weight_list = []
+    for neighbors in adjacency:
+        targets.extend(neighbors)
+        weight_list.extend(neighbors.values())
+        offsets.append(len(targets))
+    nodes = list(range(num_nodes))
+    return CSRGraph(nodes, {node: node for node in nodes}, offsets, targets, _weight_array(weight_list))
+
+# Dialin kauhajono kokonaislukupainoille: kauha k sisältää solmut, joiden etäisyys on välillä
+# [k*delta, (k+1)*delta), missä delta on pienin linkin paino. Kauhan kaikki solmut ovat tällöin
+# lopullisia, kun kauhaan päästään, eikä kauhaan lisätä solmuja sen käsittelyn aikana. Kauha
+# järjestetään (etäisyys, solmu) -järjestykseen ennen käsittelyä, jolloin solmut käsitellään samassa
+# järjestyksessä kuin keossa ja tasapisteissä valitaan sama edeltäjä (sama reititystaulu). Kauhat
+# ovat rengas, sillä uusi etäisyys on enintään suurimman painon verran nykyistä edellä. Jonoon
+# tallennetaan vain solmunumerot: ei etäisyyksiä, monikkoja eikä kekovertailuja. Tyhjien kauhojen
+# läpikäynti maksaa, joten kauhajonoa käytetään vain, kun kauhoja tarvitaan enintään DIAL_MAX_BUCKETS.
+DIAL_MAX_BUCKETS = 512
+
+# (delta, kauhojen määrä) tai None, jos painot eivät ole positiivisia kokonaislukuja tai kauhoja tarvittaisiin liikaa
+def dial_buckets(csr):
+    weights = csr.weights
+    if not isinstance(weights, array) or weights.typecode != 'q' or not weights:
+        return None
+    low, high = min(weights), max(weights)
+    if low <= 0 or high // low + 2 > DIAL_MAX_BUCKETS:
+        return None
+    return low, high // low + 2
+
+# Dijkstra CSR-taulukoiden yli; lähde ja tulokset kokonaislukutunnisteina (prev = -1, jos ei edeltäjää).
+# Jono valitaan painojen mukaan: dial=None valitsee automaattisesti, False pakottaa keon.
+def dijkstra_csr(csr, source, dial=None):
+    if dial is None:
+        dial = dial_buckets(csr)
+    if dial:
+        return dial_dijkstra_csr(csr, source, *dial)
+    return heap_dijkstra_csr(csr, source)
+
+def dial_dijkstra_csr(csr, source, delta, size):
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    dist = [float('inf')] * len(csr.nodes)
+    prev = [-1] * len(csr.nodes)
+    settled = bytearray(len(csr.nodes))
+    dist[source] = 0
+    buckets = [[] for _ in range(size)]
+    buckets[0].append(source)
+    pending = 1
+    k = 0
+
+    while pending:
+        bucket = buckets[k % size]
+        pending -= len(bucket)
+        if len(bucket) > 1:
+            # Vakaa lajittelu: ensin solmun, sitten etäisyyden mukaan
+            bucket.sort()
+            bucket.sort(key=dist.__getitem__)
+        for u in bucket:
+            # Solmu voi olla jonossa useaan kertaan; vain ensimmäinen käsittely on tarpeen
+            if settled[u]:
+                continue
+            settled[u] = 1
+            current_dist = dist[u]
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                alt = current_dist + weights[i]
+                if alt < dist[v]:
+                    dist[v] = alt
+                    prev[v] = u
+                    buckets[alt // delta % size].append(v)
+                    pending += 1
+        bucket.clear()
+        k += 1
+
+    return dist, prev
+
+def heap_dijkstra_csr(csr, source):
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    dist = [float('inf')] * len(csr.nodes)
+    prev = [-1] * len(csr.nodes)
+    dist[source] = 0
+    queue = [(0, source)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    while queue:
+        current_dist, u = heappop(queue)
+
+        if current_dist > dist[u]:
+            continue
+
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            alt = current_dist + weights[i]
+            if alt < dist[v]:
+                dist[v] = alt
+                prev[v] = u
+                heappush(queue, (alt, v))
+
+    return dist, prev
+
+# Muuntaa dijkstra_csr():n taulukot samoiksi dist/prev-sanakirjoiksi kuin dijkstra() palauttaa
+def csr_result_to_dicts(csr, dist_list, prev_list):
+    nodes = csr.nodes
+    dist = dict(zip(nodes, dist_list))
+    prev = {node: (nodes[p] if p >= 0 else None) for node, p in zip(nodes, prev_list)}
+    return dist, prev
+
+def dijkstra_from_csr(csr, source):
+    return csr_result_to_dicts(csr, *dijkstra_csr(csr, csr.index[source]))
+
+# Rinnakkaisajo: jokainen työprosessi saa CSR-verkon kerran alustuksessa ja käsittelee osan lähteistä
+_worker_csr = None
+_worker_adjacency = None
+_worker_dial = None
+
+def _init_worker(csr):
+    global _worker_csr, _worker_adjacency, _worker_dial
+    _worker_csr = csr
+    _worker_adjacency = None
+    _worker_dial = dial_buckets(csr) or False
+
+def _dijkstra_worker(source):
+    return dijkstra_csr(_worker_csr, source, _worker_dial)
+
+# ECMP-rivi: (dist, seuraavien hyppyjen bittijoukot, yhtä lyhyiden polkujen määrät)
+def _ecmp_row(adjacency, source):
+    dist, hops, counts, _ = ecmp_dijkstra(adjacency, source)
+    return dist, compact_hops(hops, len(adjacency[source])), counts
+
+def _ecmp_worker(source):
+    global _worker_adjacency
+    if _worker_adjacency is None:
+        _worker_adjacency = csr_adjacency(_worker_csr.offsets, _worker_csr.targets, _worker_csr.weights)
+    return _ecmp_row(_worker_adjacency, source)
+
+# Raa'at (dist, prev) -taulukot annetuista lähteistä (kokonaislukutunnisteina, oletuksena kaikki
+# solmut) annetussa järjestyksessä; workers > 1 jakaa lähteet prosessipoolille
+def dijkstra_rows(csr, workers=1, sources=None):
+    if sources is None:
+        sources = range(len(csr.nodes))
+    if workers <= 1:
+        dial = dial_buckets(csr) or False
+        for source in sources:
+            yield dijkstra_csr(csr, source, dial)
+        return
+    chunksize = max(1, len(sources) // (workers * 4))
+    with Pool(workers, initializer=_init_worker, initargs=(csr,)) as pool:
+        yield from pool.imap(_dijkstra_worker, sources, chunksize)
+
+# ECMP-rivit kaikista solmuista solmujärjestyksessä, kuten dijkstra_rows
+def ecmp_rows(csr, workers=1):
+    sources = range(len(csr.nodes))
+    if workers <= 1:
+        adjacency = csr_adjacency(csr.offsets, csr.targets, csr.weights)
+        for source in sources:
+            yield _ecmp_row(adjacency, source)
+        return
+    chunksize = max(1, len(sources) // (workers * 4))
+    with Pool(workers, initializer=_init_worker, initargs=(csr,)) as pool:
+        yield from pool.imap(_ecmp_worker, sources, chunksize)
+
+# Ajaa Dijkstran kaikista solmuista (workers > 1: prosessipoolissa); tulokset tulevat solmujärjestyksessä
+def parallel_dijkstra(csr, workers):
+    for dist_list, prev_list in dijkstra_rows(csr, workers):
+        yield csr_result_to_dicts(csr, dist_list, prev_list)
+
+# Välimuistitettu ajo: etäisyys- ja edeltäjämatriisit tallennetaan topologian tiivisteellä,
+# joten saman verkon uusi ajo lukee tulokset levyltä. Kokonaislukupainoilla
+# saavuttamaton etäisyys tallennetaan arvona -1. Ensimmäisellä ajolla rivit annetaan eteenpäin
+# sitä mukaa kuin ne lasketaan, ja välimuisti kirjoitetaan viimeisen rivin jälkeen.
+def cached_dijkstra(csr, workers=1):
+    num_nodes = len(csr.nodes)
+    if not isinstance(csr.weights, array):
+        if workers > 1:
+            yield from parallel_dijkstra(csr, workers)
+        else:
+            for source in csr.nodes:
+                yield dijkstra_from_csr(csr, source)
+        return
+    integer = csr.weights.typecode == 'q'
+    key = arrays_key(repr(csr.nodes).encode(), csr.offsets, csr.targets, csr.weights)
+    path = cache_path(key, 'ospf')
+    cached = load_arrays(path)
+    if cached is None:
+        dist_all = array(csr.weights.typecode)
+        prev_all = array('q')
+        for dist_list, prev_list in dijkstra_rows(csr, workers):
+            dist_all.extend([-1 if d == float('inf') else d for d in dist_list] if integer else dist_list)
+            prev_all.extend(prev_list)
+            yield csr_result_to_dicts(csr, dist_list, prev_list)
+        save_arrays(path, num_nodes, dist=dist_all, prev=prev_all)
+        return
+    dist_all, prev_all = cached[1]['dist'], cached[1]['prev']
+
+    for source in range(num_nodes):
+        row = slice(source * num_nodes, (source + 1) * num_nodes)
+        dist_list = dist_all[row].tolist()
+        if integer:
+            dist_list = [float('inf') if d < 0 else d for d in dist_list]
+        yield csr_result_to_dicts(csr, dist_list, prev_all[row].tolist())
+
 def reconstruct_path(prev, target):
     path = []
     while target is not None:
@@ -34,28 +277,83 @@ def reconstruct_path(prev, target):
         target = prev[target]
     return path[::-1]
 
-def print_and_save_routing_tables(graph, filename=polku):
-    with open(filename, 'w') as f:
-        for router in graph.nodes():
-            dist, prev = dijkstra(graph, router)
-            header = f"Reititystaulu reitittimelle {router}:\n"
-            print(header, end='')
-            f.write(header)
-            for target in graph.nodes():
-                if target == router:
-                    continue
-                if dist[target] == float('inf'):
-                    line = f" -> Reititin {target}: ei reittiä\n"
-                else:
-                    path = reconstruct_path(prev, target)
-                    path_str = " -> ".join(map(str, path))
-                    line = f" -> Reititin {target}: etäisyys {dist[target]}, reitti: {path_str}\n"
-                print(line, end='')
-                f.write(line)
-            print()
-            f.write("\n")
+# Muotoilee yhden reitittimen taulun yhdeksi merkkijonoksi. Polut kootaan edeltäjäpuusta
+# muistiin tallennettujen etuliitteiden avulla, joten jokainen polku rakennetaan vain kerran.
+def format_routing_table(router, nodes, dist, prev):
+    inf = float('inf')
+    path_strs = {router: str(router)}
+    lines = [f"Reititystaulu reitittimelle {router}:\n"]
+    for target in nodes:
+        if target == router:
+            continue
+        if dist[target] == inf:
+            lines.append(f" -> Reititin {target}: ei reittiä\n")
+            continue
+        chain = []
+        node = target
+        while node not in path_strs:
+            chain.append(node)
+            node = prev[node]
+        path_str = path_strs[node]
+        for node in reversed(chain):
+            path_str = f"{path_str} -> {node}"
+            path_strs[node] = path_str
+        lines.append(f" -> Reititin {target}: etäisyys {dist[target]}, reitti: {path_str}\n")
+    lines.append("\n")
+    return "".join(lines)
+
+# ECMP-taulu: jokaiselle kohteelle kaikki yhtä hyvät seuraavat hypyt ja yhtä lyhyiden polkujen määrä
+def format_ecmp_table(csr, source, dist, hops, counts):
+    inf = float('inf')
+    neighbors = csr.targets[csr.offsets[source]:csr.offsets[source + 1]]
+    lines = [f"Reititystaulu reitittimelle {csr.nodes[source]} (ECMP):\n"]
+    for target, node in enumerate(csr.nodes):
+        if target == source:
+            continue
+        if dist[target] == inf:
+            lines.append(f" -> Reititin {node}: ei reittiä\n")
+            continue
+        next_hops = ", ".join(str(csr.nodes[h]) for h in hop_list(neighbors, hops[target]))
+        lines.append(f" -> Reititin {node}: etäisyys {dist[target]}, seuraavat hypyt: {next_hops}, "
+                     f"polkuja {counts[target]}\n")
+    lines.append("\n")
+    return "".join(lines)
+
+# echo=False: taulut vain tiedostoon, konsoliin pelkkä yhteenveto.
+# graph voi olla myös valmis CSRGraph, jolloin networkx-verkkoa ei tarvita lainkaan.
+# ecmp=True: yhden edeltäjän sijaan kaikki yhtä hyvät seuraavat hypyt (välimuistia ei käytetä).
+def print_and_save_routing_tables(graph, filename=polku, use_csr=False, workers=1, cache=False, echo=True, ecmp=False):
+    if isinstance(graph, CSRGraph):
+        csr, nodes = graph, graph.nodes
+    else:
+        csr = build_csr(graph) if use_csr or workers > 1 or cache or ecmp else None
+        nodes = list(graph.nodes())
+    if ecmp:
+        results = ecmp_rows(csr, workers)
+    elif cache:
+        results = cached_dijkstra(csr, workers)
+    elif csr is not None:
+        results = parallel_dijkstra(csr, workers)
+    else:
+        results = (dijkstra(graph, router) for router in nodes)
+    # Tulokset käydään loppuun asti, jotta cached_dijkstra ehtii tallentaa välimuistin
+    with open(filename, 'w', buffering=WRITE_BUFFER) as f:
+        for source, result in enumerate(results):
+            if ecmp:
+                block = format_ecmp_table(csr, source, *result)
+            else:
+                block = format_routing_table(nodes[source], nodes, *result)
+            f.write(block)
+            if echo:
+                sys.stdout.write(block)
+    if not echo:
+        print(f"Reititystaulut {len(nodes)} reitittimelle tallennettu tiedostoon {filename}")
 
+# Piirtokirjastot tuodaan vasta tarvittaessa, jotta reitityslaskenta käynnistyy nopeasti ilman niitä
 def draw_network(graph):
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
     pos = nx.spring_layout(graph, seed=42)
     labels = nx.get_edge_attributes(graph, 'weight')
     nx.draw(graph, pos, with_labels=True, node_color='lightblue', node_size=1200, font_size=10, font_weight='bold')
@@ -63,7 +361,14 @@ def draw_network(graph):
     plt.title("OSPF-verkko")
     plt.show()
 
-def main():
+# --workers N: reititystaulut lasketaan N prosessilla
+def main(argv=None):
+    import networkx as nx
+
+    parser = argparse.ArgumentParser(description="OSPF-reititystaulut (Dijkstra) syötetylle verkolle")
+    parser.add_argument('--workers', type=int, default=1, help="rinnakkaisten prosessien määrä (oletus 1)")
+    args = parser.parse_args(argv)
+
     G = nx.Graph()
 
     num_routers = int(input("Syötä reitittimien määrä: "))
@@ -78,7 +383,7 @@ def main():
         G.add_edge(u, v, weight=w)
 
     print("\nSuoritetaan OSPF (Dijkstra) jokaiselle reitittimelle...\n")
-    print_and_save_routing_tables(G)
+    print_and_save_routing_tables(G, use_csr=True, workers=args.workers, cache=True, echo=num_routers <= ECHO_LIMIT)
 
     print("\nPiirretään verkko graafisesti...")
     draw_network(G)
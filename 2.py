@@ -1,6 +1,19 @@
-import networkx as nx
-import matplotlib.pyplot as plt
 import os
+import sys
+from array import array
+
+from valimuisti import arrays_key, cache_path, cached_network_from_file, file_key, load_arrays, save_arrays
+from verkkolukija import print_rejected
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Taulut kirjoitetaan reititin kerrallaan suurina puskuroituina erinä; konsoliin tulostetaan
+# täydet taulut vain pienille verkoille
+WRITE_BUFFER = 1 << 20
+ECHO_LIMIT = 100
 
 def initialize_routing_tables(num_routers, links):
     tables = []
@@ -30,13 +43,17 @@ def update_routing_table(tables, current, neighbor, cost_to_neighbor):
             updated = True
     return updated
 
-def rip_simulation(num_routers, links):
+# triggered=True: laukaistut päivitykset. Reititin arvioidaan vain, jos sen oma tai jonkin
+# naapurin taulu on muuttunut edellisen arvioinnin jälkeen; muut päivitykset eivät voisi muuttaa mitään,
+# joten taulut ja kierrosten määrä ovat samat kuin täydessä ajossa.
+def rip_simulation(num_routers, links, triggered=False):
     tables = initialize_routing_tables(num_routers, links)
     neighbors = [[] for _ in range(num_routers)]
     for u, v, _ in links:
         neighbors[u].append(v)
         neighbors[v].append(u)
 
+    dirty = [True] * num_routers
     changes = True
     round = 0
     while changes:
@@ -44,33 +61,152 @@ def rip_simulation(num_routers, links):
         round += 1
         print(f"\n--- RIP-kierros {round} ---")
         for router in range(num_routers):
+            if triggered:
+                if not dirty[router]:
+                    continue
+                dirty[router] = False
+            router_changed = False
             for neighbor in neighbors[router]:
                 cost_to_neighbor = tables[router][neighbor][0]
                 if update_routing_table(tables, router, neighbor, cost_to_neighbor):
                     changes = True
+                    router_changed = True
+            if router_changed:
+                dirty[router] = True
+                for neighbor in neighbors[router]:
+                    dirty[neighbor] = True
     return tables
 
+# RIP taulukoilla: kustannukset ja seuraavat hypyt n x n -matriiseina (vaatii NumPyn).
+# Reitittimet ja naapurit käsitellään samassa järjestyksessä kuin rip_simulation-funktiossa, mutta
+# yksi naapuripäivitys on taulukko-operaatio kaikille kohteille kerralla. Päivitys käyttää vain
+# naapurin riviä ja kiinteää kustannusta naapuriin, joten kohteiden käsittelyjärjestyksellä ei ole
+# väliä: taulut, tasapelien seuraavat hypyt ja kierrosten määrä ovat samat kuin rip_simulation-funktiossa.
+# Palauttaa matriisit rivijärjestyksessä litteinä taulukoina (cost, next_hop); taulut muodostetaan niistä
+# reititin kerrallaan iter_tables_from_arrays-funktiolla.
+def rip_simulation_vectorized(num_routers, links, triggered=False):
+    n = num_routers
+    cost = np.full((n, n), np.inf)
+    next_hop = np.full((n, n), -1, dtype=np.int64)
+    routers = np.arange(n)
+    cost[routers, routers] = 0
+    next_hop[routers, routers] = routers
+    neighbors = [[] for _ in range(n)]
+    for u, v, c in links:
+        cost[u, v] = cost[v, u] = c
+        next_hop[u, v], next_hop[v, u] = v, u
+        neighbors[u].append(v)
+        neighbors[v].append(u)
+
+    candidate = np.empty(n)
+    better = np.empty(n, dtype=bool)
+    dirty = [True] * n
+    changes = True
+    round = 0
+    while changes:
+        changes = False
+        round += 1
+        print(f"\n--- RIP-kierros {round} ---")
+        for router in range(n):
+            if triggered:
+                if not dirty[router]:
+                    continue
+                dirty[router] = False
+            row, hops = cost[router], next_hop[router]
+            router_changed = False
+            for neighbor in neighbors[router]:
+                np.add(cost[neighbor], row[neighbor], out=candidate)
+                np.less(candidate, row, out=better)
+                if better.any():
+                    np.copyto(row, candidate, where=better)
+                    hops[better] = neighbor
+                    changes = True
+                    router_changed = True
+            if router_changed:
+                dirty[router] = True
+                for neighbor in neighbors[router]:
+                    dirty[neighbor] = True
+    return cost.ravel(), next_hop.ravel()
+
+# Taulut (kuten initialize_routing_tables: {kohde: (kustannus, seuraava)}) reititin kerrallaan
+# litteistä n x n -matriiseista (-1 = ei hyppyä). Kerrallaan muistissa on vain yksi taulu, joten
+# print_routing_tables ja save_to_file voivat kirjoittaa taulut suoraan matriiseista.
+def iter_tables_from_arrays(num_routers, cost, next_hop):
+    inf = float('inf')
+    for start in range(0, num_routers * num_routers, num_routers):
+        row = slice(start, start + num_routers)
+        table = {}
+        for dest, (c, hop) in enumerate(zip(cost[row].tolist(), next_hop[row].tolist())):
+            if c == inf:
+                table[dest] = (inf, None)
+            else:
+                table[dest] = (int(c) if c.is_integer() else c, hop)
+        yield table
+
+# rip_simulation():n taulut samoiksi litteiksi matriiseiksi kuin rip_simulation_vectorized palauttaa
+def table_arrays(tables):
+    cost = array('d')
+    next_hop = array('q')
+    for table in tables:
+        for dest in range(len(tables)):
+            c, hop = table[dest]
+            cost.append(c)
+            next_hop.append(-1 if hop is None else hop)
+    return cost, next_hop
+
+# Välimuisti: taulut tallennetaan n x n -kustannus- ja seuraava hyppy -matriiseina
+def save_tables(path, num_routers, cost, next_hop):
+    if not isinstance(cost, array):
+        cost, next_hop = array('d', cost.tobytes()), array('q', next_hop.tobytes())
+    save_arrays(path, num_routers, cost=cost, next_hop=next_hop)
+
+# Palauttaa (cost, next_hop) kopioimattomina näkyminä tai None
+def load_tables(path, num_routers):
+    cached = load_arrays(path)
+    if cached is None or cached[0] != num_routers:
+        return None
+    return cached[1]['cost'], cached[1]['next_hop']
+
+# Laukaistu RIP linkkilistasta välimuistin kautta (avaimena linkkilistan tiiviste); palauttaa (cost, next_hop)
+def cached_rip(num_routers, links, cache=True):
+    path = None
+    if cache:
+        flat = array('d')
+        for link in links:
+            flat.extend(link)
+        path = cache_path(arrays_key(num_routers.to_bytes(8, 'little'), flat), 'rip')
+        routes = load_tables(path, num_routers)
+        if routes is not None:
+            return routes
+    if np is not None:
+        routes = rip_simulation_vectorized(num_routers, links, triggered=True)
+    else:
+        routes = table_arrays(rip_simulation(num_routers, links, triggered=True))
+    if path is not None:
+        save_tables(path, num_routers, *routes)
+    return routes
+
+def format_routes(table):
+    inf = float('inf')
+    return "".join(
+        f" -> {dest}: ei reittiä\n" if cost == inf else f" -> {dest}: etäisyys {cost}, seuraava {next_hop}\n"
+        for dest, (cost, next_hop) in table.items()
+    )
+
 def print_routing_tables(tables):
     for i, table in enumerate(tables):
-        print(f"\nReititystaulu reitittimelle {i}:")
-        for dest, (cost, next_hop) in table.items():
-            if cost == float('inf'):
-                print(f" -> {dest}: ei reittiä")
-            else:
-                print(f" -> {dest}: etäisyys {cost}, seuraava {next_hop}")
+        sys.stdout.write(f"\nReititystaulu reitittimelle {i}:\n{format_routes(table)}")
 
 def save_to_file(tables, filename="rip_reititystaulut.txt"):
-    with open(filename, 'w') as f:
+    with open(filename, 'w', buffering=WRITE_BUFFER) as f:
         for i, table in enumerate(tables):
-            f.write(f"Reititystaulu reitittimelle {i}:\n")
-            for dest, (cost, next_hop) in table.items():
-                if cost == float('inf'):
-                    f.write(f" -> {dest}: ei reittiä\n")
-                else:
-                    f.write(f" -> {dest}: etäisyys {cost}, seuraava {next_hop}\n")
-            f.write("\n")
+            f.write(f"Reititystaulu reitittimelle {i}:\n{format_routes(table)}\n")
 
+# Piirtokirjastot tuodaan vasta tarvittaessa; RIP-laskenta ei tarvitse niitä
 def draw_network(num_routers, links):
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
     G = nx.Graph()
     G.add_nodes_from(range(num_routers))
     for u, v, cost in links:
@@ -84,23 +220,6 @@ def draw_network(num_routers, links):
     plt.title("RIP-reititysverkko")
     plt.show()
 
-def read_network_from_file(filename):
-    links = set()
-    with open(filename, 'r') as f:
-        first_line = f.readline().split()
-        num_routers, num_links = int(first_line[0]), int(first_line[1])
-        for i in range(num_links):
-            line = f.readline().split()
-            if len(line) != 3:
-                continue
-            u, v, cost = map(int, line)
-            if u == v or cost <= 0 or u < 0 or v < 0 or u >= num_routers or v >= num_routers:
-                continue
-            if (u, v) in links or (v, u) in links:
-                continue
-            links.add((u, v, cost))
-    return num_routers, list(links)
-
 def ask_network_input():
     num_routers = int(input("Syötä reitittimien määrä: "))
     num_links = int(input("Syötä reittien määrä: "))
@@ -132,19 +251,36 @@ def ask_network_input():
 def main():
     print("Haluatko lukea verkon tiedostosta (verkko.txt)? (k/e): ", end='')
     from_file = input().strip().lower() == 'k'
+    key = None
     if from_file and os.path.exists("verkko.txt"):
-        num_routers, links = read_network_from_file("verkko.txt")
+        key = file_key("verkko.txt")
+        rejected = []
+        num_routers, links = cached_network_from_file("verkko.txt", rejected, key)
+        # Sama linkkijärjestys kuin aiemmalla joukkoon lukeneella lukijalla: naapurien järjestys
+        # ratkaisee tasapelien seuraavat hypyt, joten taulut pysyvät ennallaan
+        links = list(set(links))
         print(f"\n✅ Luettiin {len(links)} linkkiä tiedostosta.")
+        print_rejected(rejected)
     else:
         num_routers, links = ask_network_input()
 
-    print("\n--- Suoritetaan RIP ---")
-    tables = rip_simulation(num_routers, links)
+    routes = load_tables(cache_path(key, 'rip'), num_routers) if key else None
+    if routes is not None:
+        print("\n--- RIP-taulut luettiin välimuistista ---")
+    else:
+        print("\n--- Suoritetaan RIP ---")
+        if np is not None:
+            routes = rip_simulation_vectorized(num_routers, links, triggered=True)
+        else:
+            routes = table_arrays(rip_simulation(num_routers, links, triggered=True))
+        if key:
+            save_tables(cache_path(key, 'rip'), num_routers, *routes)
 
-    print("\n--- LOPULLISET REITITYSTAULUT ---")
-    print_routing_tables(tables)
+    if num_routers <= ECHO_LIMIT:
+        print("\n--- LOPULLISET REITITYSTAULUT ---")
+        print_routing_tables(iter_tables_from_arrays(num_routers, *routes))
 
-    save_to_file(tables)
+    save_to_file(iter_tables_from_arrays(num_routers, *routes))
     print("\n💾 Reititystaulut tallennettu tiedostoon: rip_reititystaulut.txt")
 
     draw_network(num_routers, links)
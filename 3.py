@@ -1,36 +1,164 @@
-import matplotlib.pyplot as plt
-import networkx as nx
-import matplotlib.animation as animation
+import argparse
+import heapq
+from array import array
+from itertools import count
+
+from monipolku import ecmp_dijkstra, graph_adjacency, hop_list
+from supistus import cached_hierarchy, ch_shortest_path
+
+# Dijkstra, joka kuljettaa jokaiselle solmulle ensimmäisen hypyn polkulistojen sijaan:
+# naapurin ensimmäinen hyppy periytyy edeltäjältä (tai on naapuri itse lähteen vierestä).
+# Jonon järjestys ja tasapelien käsittely vastaavat nx.single_source_dijkstraa, joten taulut ovat samat.
+# adjacency: {solmu: [(naapuri, paino), ...]} (ks. adjacency_lists)
+def first_hops(adjacency, src):
+    settled = set()
+    seen = {src: 0}
+    first = {src: None}
+    counter = count()
+    queue = [(0, next(counter), src)]
+    while queue:
+        d, _, v = heapq.heappop(queue)
+        if v in settled:
+            continue
+        settled.add(v)
+        for u, weight in adjacency[v]:
+            if u in settled:
+                continue
+            alt = d + weight
+            if u not in seen or alt < seen[u]:
+                seen[u] = alt
+                first[u] = u if v == src else first[v]
+                heapq.heappush(queue, (alt, next(counter), u))
+    return first
+
+# Verkon naapurilistat kerran kaikkia lähteitä varten (networkx-näkymien läpikäynti on hidasta)
+def adjacency_lists(graph):
+    return {v: [(u, attrs.get('weight', 1)) for u, attrs in graph[v].items()] for v in graph.nodes()}
 
 # Reititystaulun muodostus RIP-tyyliin (next-hop)
 def build_routing_table(graph, nodes):
+    adjacency = adjacency_lists(graph)
     table = {}
     for src in nodes:
         table[src] = {}
-        lengths, paths = nx.single_source_dijkstra(graph, src)
+        hops = first_hops(adjacency, src)
         for dst in nodes:
-            if dst == src or dst not in paths:
+            if dst == src or dst not in hops:
                 continue
-            path = paths[dst]
-            if len(path) > 1:
-                table[src][dst] = path[1]
+            table[src][dst] = hops[dst]
     return table
 
-# Laske reitti RIP-taulun perusteella
+# ECMP-tila: table[src][dst] = kaikki yhtä hyvät seuraavat hypyt (tuple) yhden sijaan
+def build_ecmp_routing_table(graph, nodes):
+    num_nodes = max(max(nodes, default=-1), max(graph.nodes(), default=-1)) + 1
+    adjacency = graph_adjacency(graph, num_nodes)
+    table = {}
+    for src in nodes:
+        _, hops, _, _ = ecmp_dijkstra(adjacency, src)
+        neighbors = [v for v, _ in adjacency[src]]
+        table[src] = {dst: tuple(hop_list(neighbors, hops[dst])) for dst in nodes if dst != src and hops[dst]}
+    return table
+
+# Reittikyselyn tila
+REACHED, LOOP, UNREACHABLE = 'reached', 'loop', 'unreachable'
+STATUSES = (REACHED, LOOP, UNREACHABLE)
+
+# Laske reitti RIP-taulun perusteella; silmukan tai puuttuvan reitin kohdalla palautetaan tyhjä lista
 def shortest_path(start, end, table):
     path = [start]
+    visited = {start}
     current = start
     while current != end:
         next_hop = table.get(current, {}).get(end)
-        if next_hop is None or next_hop in path:
-            print("Reittiä ei löytynyt tai havaittiin silmukka.")
-            break
+        if next_hop is None:
+            print("Reittiä ei löytynyt.")
+            return []
+        if next_hop in visited:
+            print("Havaittiin silmukka.")
+            return []
         path.append(next_hop)
+        visited.add(next_hop)
         current = next_hop
     return path
 
-# Animaation piirto
+# Sama kysely supistushierarkialla ilman reititystauluja (ch: supistus.cached_hierarchy)
+def hierarchy_path(ch, start, end):
+    size = len(ch.rank)
+    path = ch_shortest_path(ch, start, end)[1] if 0 <= start < size and 0 <= end < size else []
+    if not path:
+        print("Reittiä ei löytynyt.")
+    return path
+
+# Tiheä next-hop-taulukko: next_hops[src * n + dst] = seuraava hyppy, -1 = ei reittiä
+def next_hop_array(table, num_nodes):
+    next_hops = array('i', [-1]) * (num_nodes * num_nodes)
+    for src, row in table.items():
+        base = src * num_nodes
+        for dst, hop in row.items():
+            next_hops[base + dst] = hop
+    return next_hops
+
+# Kulkee next-hop-ketjut usealle (lähde, kohde) -parille; tuottaa (tila, polku) kyselyjen järjestyksessä.
+# Silmukka tunnistetaan vakioajassa leimataulukosta (leimana kyselyn numero, joten taulukkoa ei tyhjennetä).
+# Epäonnistuneen kyselyn polku päättyy umpikujaan tai toistuvaan solmuun.
+def walk_paths(next_hops, num_nodes, pairs):
+    seen = array('q', [-1]) * num_nodes
+    for query, (start, end) in enumerate(pairs):
+        path = [start]
+        seen[start] = query
+        node = start
+        status = REACHED
+        while node != end:
+            node = next_hops[node * num_nodes + end]
+            if node < 0:
+                status = UNREACHABLE
+                break
+            path.append(node)
+            if seen[node] == query:
+                status = LOOP
+                break
+            seen[node] = query
+        yield status, path
+
+# Kaikkien lähteiden tila yhdelle kohteelle O(n)-ajassa: jokainen ketju kuljetaan vain siihen asti,
+# kunnes se osuu jo ratkaistuun solmuun. Palauttaa taulukon STATUSES-indeksejä (kohteelle itselleen REACHED).
+def forwarding_status(next_hops, num_nodes, end):
+    reached, loop, unreachable = range(len(STATUSES))
+    unknown, on_stack = -1, -2
+    status = array('b', [unknown]) * num_nodes
+    status[end] = reached
+    for src in range(num_nodes):
+        chain = []
+        node = src
+        while status[node] == unknown:
+            status[node] = on_stack
+            chain.append(node)
+            node = next_hops[node * num_nodes + end]
+            if node < 0:
+                result = unreachable
+                break
+        else:
+            result = loop if status[node] == on_stack else status[node]
+        for node in chain:
+            status[node] = result
+    return status
+
+# Koko verkon välitysjohdonmukaisuus: palauttaa {tila: parien määrä} kaikille pareille lähde != kohde
+def validate_forwarding(next_hops, num_nodes):
+    counts = [0] * len(STATUSES)
+    for end in range(num_nodes):
+        for code in forwarding_status(next_hops, num_nodes, end):
+            counts[code] += 1
+        # Kohde itse ei ole kysely
+        counts[0] -= 1
+    return dict(zip(STATUSES, counts))
+
+# Animaation piirto; piirtokirjastot tuodaan vasta kutsuttaessa
 def animate_path(G, path):
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+    import networkx as nx
+
     pos = nx.spring_layout(G, seed=42)
     fig, ax = plt.subplots()
     nx.draw_networkx_nodes(G, pos, ax=ax, node_color='lightblue')
@@ -53,8 +181,14 @@ def animate_path(G, path):
     plt.title(f"Paketin reitti: {path}")
     plt.show()
 
-# Pääohjelma käyttäjän syötteellä
-def main():
+# Pääohjelma käyttäjän syötteellä; --ch: reittikysely supistushierarkialla reititystaulujen sijaan
+def main(argv=None):
+    import networkx as nx
+
+    parser = argparse.ArgumentParser(description="RIP-simulaatio (next-hop-taulut)")
+    parser.add_argument('--ch', action='store_true', help="käytä supistushierarkiaa reittikyselyyn")
+    args = parser.parse_args(argv)
+
     print("Syötä solmujen ja linkkien tiedot (RIP-simulaatio)")
     num_nodes = int(input("Anna solmujen määrä: "))
     G = nx.Graph()
@@ -72,19 +206,26 @@ def main():
             continue
         G.add_edge(u, v, weight=w)
 
-    routing_table = build_routing_table(G, nodes)
+    if args.ch:
+        size = max([num_nodes, *(v + 1 for v in G.nodes())])
+        ch = cached_hierarchy(size, [(u, v, d['weight']) for u, v, d in G.edges(data=True)])
+    else:
+        routing_table = build_routing_table(G, nodes)
 
-    print("\nRIP-reititystaulut (next-hop):")
-    for src in routing_table:
-        print(f"{src}: {routing_table[src]}")
+        print("\nRIP-reititystaulut (next-hop):")
+        for src in routing_table:
+            print(f"{src}: {routing_table[src]}")
 
     start = int(input("Anna lähdesolmu: "))
     end = int(input("Anna kohdesolmu: "))
 
-    path = shortest_path(start, end, routing_table)
-    print("Laskettiin reitti:", path)
-
-    animate_path(G, path)
+    if args.ch:
+        path = hierarchy_path(ch, start, end)
+    else:
+        path = shortest_path(start, end, routing_table)
+    if path:
+        print("Laskettiin reitti:", path)
+        animate_path(G, path)
 
 # Suorita ohjelma
 if __name__ == "__main__":
@@ -1,42 +1,4 @@
-import random
-import time
-import networkx as nx
-import matplotlib.pyplot as plt
-
-class BGPRouter:
-    def __init__(self, operator_name, as_number):
-        self.operator_name = operator_name  # Käytetään operaattorin nimeä AS:n sijasta
-        self.as_number = as_number  # AS-numero
-        self.routing_table = {}
-        self.peers = []
-
-    def add_peer(self, peer):
-        """Lisää BGP-naapuri (peer)."""
-        self.peers.append(peer)
-
-    def send_update(self):
-        """Lähetä reitityspäivitys naapureille."""
-        for peer in self.peers:
-            peer.receive_update(self.routing_table, self.operator_name)
-
-    def receive_update(self, routes, peer_operator):
-        """Vastaanota reitityspäivitys naapureilta."""
-        print(f"{self.operator_name} vastaanotti reitityspäivityksen {peer_operator}:ltä")
-        
-        for prefix, cost in routes.items():
-            if prefix not in self.routing_table or self.routing_table[prefix] > cost:
-                self.routing_table[prefix] = cost
-                print(f"{self.operator_name} päivitti reitin {prefix}: etäisyys {cost}")
-
-    def display_routing_table(self):
-        """Näytä reititystaulu."""
-        print(f"{self.operator_name} ({self.as_number}) Reititystaulu:")
-        for prefix, cost in self.routing_table.items():
-            print(f"  {prefix} => Etäisyys: {cost}")
-
-    def get_routing_data(self):
-        """Hae reititystiedot kaaviota varten."""
-        return [(self.operator_name, prefix, cost) for prefix, cost in self.routing_table.items()]
+from bgpsimulaatio import BGPRouter, BGPSimulator, print_next_hops
 
 def bgp_simulation():
     # Luo kolme BGP-reititintä (Elisa, Telia, DNA)
@@ -50,10 +12,11 @@ def bgp_simulation():
     telia.add_peer(dna)
     dna.add_peer(telia)
 
-    # Määrittele alkuperäiset reitit BGP-reitittimille
-    elisa.routing_table = {'10.0.0.0/24': 10, '192.168.1.0/24': 20}
-    telia.routing_table = {'10.0.0.0/24': 5, '192.168.1.0/24': 15}
-    dna.routing_table = {'10.0.0.0/24': 15, '192.168.1.0/24': 10}
+    # Määrittele alkuperäiset reitit BGP-reitittimille; päivitykset kulkevat tapahtumajonon kautta
+    simulator = BGPSimulator([elisa, telia, dna], verbose=True)
+    simulator.originate(elisa, {'10.0.0.0/24': 10, '192.168.1.0/24': 20})
+    simulator.originate(telia, {'10.0.0.0/24': 5, '192.168.1.0/24': 15})
+    simulator.originate(dna, {'10.0.0.0/24': 15, '192.168.1.0/24': 10})
 
     # Lähetä alkuperäiset reitityspäivitykset
     print("\nAlustavat reititystaulut:")
@@ -61,13 +24,10 @@ def bgp_simulation():
     telia.display_routing_table()
     dna.display_routing_table()
 
-    # Simuloi reitityspäivitykset
+    # Simuloi reitityspäivitykset, kunnes verkko on konvergoitunut
     print("\nReitityspäivitykset käynnissä...\n")
-    for _ in range(3):
-        time.sleep(2)  # Odotetaan vähän, jotta päivitykset näkyvät
-        elisa.send_update()
-        telia.send_update()
-        dna.send_update()
+    stats = simulator.run()
+    print(f"\n✅ Verkko konvergoitui: {stats.messages} päivitysviestiä, {stats.updates} reittiä, simuloitu aika {stats.time}")
 
     # Näytä päivittyneet reititystaulut
     print("\nPäivittyneet reititystaulut:")
@@ -75,11 +35,18 @@ def bgp_simulation():
     telia.display_routing_table()
     dna.display_routing_table()
 
+    # Näytä seuraavat hypyt esimerkkiosoitteelle
+    print_next_hops([elisa, telia, dna], '10.0.0.1')
+
     # Visualisoi verkko
     visualize_bgp([elisa, telia, dna])
 
 def visualize_bgp(routers):
     """Visualisoi BGP-verkko ja reititystiedot."""
+    # Piirtokirjastot tuodaan vasta täällä, jotta simulaatio ei vaadi niitä
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
     G = nx.Graph()
 
     label_map = {}
@@ -1,50 +1,111 @@
+import argparse
 import networkx as nx
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 import os
-
-# Lukee verkon tiedostosta
-def read_network_from_file(filename="verkko.txt"):
-    links = set()
-    with open(filename, 'r') as f:
-        first_line = f.readline().split()
-        num_routers, num_links = int(first_line[0]), int(first_line[1])
-        for i in range(num_links):
-            line = f.readline().split()
-            if len(line) != 3:
-                continue
-            u, v, cost = map(int, line)
-            if u == v or cost <= 0 or u < 0 or v < 0 or u >= num_routers or v >= num_routers:
-                continue
-            if (u, v) in links or (v, u) in links:
-                continue
-            links.add((u, v, cost))
-    return num_routers, list(links)
-
-# Rakennetaan verkko ja lasketaan reitit Dijkstralla
-def build_graph_and_paths(num_nodes, links):
+from array import array
+from itertools import islice
+from multiprocessing import Pool
+
+from monipolku import ecmp_dijkstra, equal_cost_paths, graph_adjacency
+from reittihaku import bidirectional_dijkstra, cached_landmarks, predecessor_array, reconstruct_path
+from supistus import cached_hierarchy, ch_shortest_path
+from valimuisti import cache_path, cached_network_from_file, file_key, load_arrays, save_arrays
+from verkkolukija import print_rejected
+
+# Suuremmille verkoille ei lasketa kaikkia polkuja, vaan kysytty pari haetaan kaksisuuntaisella A*:llä maamerkkien avulla
+ALL_PAIRS_LIMIT = 2000
+# Tasapelitilanteessa näytettävien yhtä lyhyiden reittien enimmäismäärä
+ECMP_SHOW = 5
+
+# Rinnakkaisajon työprosessit: verkko välitetään kerran alustuksessa, ei jokaisen lähteen mukana
+_worker_graph = None
+_worker_compact = False
+
+def _init_worker(G, compact=False):
+    global _worker_graph, _worker_compact
+    _worker_graph = G
+    _worker_compact = compact
+
+def _paths_worker(src):
+    if _worker_compact:
+        return predecessor_array(_worker_graph, src)
+    _, paths = nx.single_source_dijkstra(_worker_graph, src)
+    return paths
+
+def build_graph(num_nodes, links):
     G = nx.Graph()
     G.add_nodes_from(range(num_nodes))
     for u, v, w in links:
         G.add_edge(u, v, weight=w)
+    return G
 
-    routing_paths = {}
-    for src in range(num_nodes):
-        _, paths = nx.single_source_dijkstra(G, src)
-        routing_paths[src] = paths
+# Rakennetaan verkko ja lasketaan reitit Dijkstralla
+def build_graph_and_paths(num_nodes, links, workers=1, compact=False, cache_key=None):
+    G = build_graph(num_nodes, links)
 
+    routing_paths = {}
+    use_cache = compact and cache_key is not None
+    cached = load_arrays(cache_path(cache_key, 'edeltajat')) if use_cache else None
+    if cached is not None:
+        # Edeltäjämatriisi välimuistista; rivit ovat kopioimattomia näkymiä mmap-tiedostoon
+        prev = cached[1]['prev']
+        for src in range(num_nodes):
+            routing_paths[src] = prev[src * num_nodes:(src + 1) * num_nodes]
+    elif workers > 1:
+        # Lähteet jaetaan prosessipoolille; imap palauttaa tulokset solmujärjestyksessä
+        chunksize = max(1, num_nodes // (workers * 4))
+        with Pool(workers, initializer=_init_worker, initargs=(G, compact)) as pool:
+            for src, paths in enumerate(pool.imap(_paths_worker, range(num_nodes), chunksize)):
+                routing_paths[src] = paths
+    elif compact:
+        for src in range(num_nodes):
+            routing_paths[src] = predecessor_array(G, src)
+    else:
+        for src in range(num_nodes):
+            _, paths = nx.single_source_dijkstra(G, src)
+            routing_paths[src] = paths
+
+    if use_cache and cached is None:
+        prev = array('i')
+        for src in range(num_nodes):
+            prev.extend(routing_paths[src])
+        save_arrays(cache_path(cache_key, 'edeltajat'), num_nodes, prev=prev)
     return G, routing_paths
 
-# Hae lyhin polku lähteestä kohteeseen
+# Hae lyhin polku lähteestä kohteeseen (kompaktissa tilassa polku kootaan edeltäjistä)
 def shortest_path(start, end, routing_paths):
-    if start in routing_paths and end in routing_paths[start]:
+    if start in routing_paths and isinstance(routing_paths[start], (array, memoryview)):
+        path = reconstruct_path(routing_paths[start], start, end)
+        if path:
+            return path
+    elif start in routing_paths and end in routing_paths[start]:
         return routing_paths[start][end]
-    else:
+    print("❌ Reittiä ei löytynyt.")
+    return []
+
+# Kaikki yhtä lyhyet reitit (ECMP): palauttaa (reittien määrä, enintään limit reittiä)
+def equal_cost_routes(G, num_nodes, start, end, limit=ECMP_SHOW):
+    _, _, counts, preds = ecmp_dijkstra(graph_adjacency(G, num_nodes), start, keep_preds=True)
+    return counts[end], list(islice(equal_cost_paths(preds, start, end), limit))
+
+# Yksittäinen kysely ilman kaikkien parien taulukkoa (landmarks: reittihaku.cached_landmarks)
+def point_to_point_path(G, start, end, landmarks):
+    _, path = bidirectional_dijkstra(G, start, end, landmarks)
+    if not path:
+        print("❌ Reittiä ei löytynyt.")
+    return path
+
+# Sama supistushierarkian kautta (ch: supistus.cached_hierarchy); esilaskennan jälkeen kysely vie mikrosekunteja
+def hierarchy_path(ch, start, end):
+    _, path = ch_shortest_path(ch, start, end)
+    if not path:
         print("❌ Reittiä ei löytynyt.")
-        return []
+    return path
 
-# Animaation piirto valitulle reitille
+# Animaation piirto valitulle reitille; matplotlib tuodaan vasta kutsuttaessa
 def animate_path(G, path):
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+
     pos = nx.spring_layout(G, seed=42)
     fig, ax = plt.subplots()
     edge_labels = nx.get_edge_attributes(G, 'weight')
@@ -69,14 +130,32 @@ def animate_path(G, path):
     plt.title(f"Paketin reitti: {path}")
     plt.show()
 
-# Pääohjelma
-def main():
+# Pääohjelma; --ch: kyselyt supistushierarkialla (lasketaan kerran ja tallennetaan välimuistiin)
+# kaikkien parien taulujen ja maamerkkien sijaan. --workers N laskee kaikkien parien taulut N prosessilla.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lyhin reitti verkko.txt-verkossa")
+    parser.add_argument('--ch', action='store_true', help="käytä supistushierarkiaa reittikyselyihin")
+    parser.add_argument('--workers', type=int, default=1, help="rinnakkaisten prosessien määrä (oletus 1)")
+    args = parser.parse_args(argv)
+
     if not os.path.exists("verkko.txt"):
         print("❌ Tiedostoa 'verkko.txt' ei löytynyt.")
         return
 
-    num_nodes, links = read_network_from_file("verkko.txt")
-    G, routing_paths = build_graph_and_paths(num_nodes, links)
+    key = file_key("verkko.txt")
+    rejected = []
+    num_nodes, links = cached_network_from_file("verkko.txt", rejected, key)
+    print_rejected(rejected)
+    ch = None
+    if args.ch:
+        G, routing_paths = build_graph(num_nodes, links), None
+        ch = cached_hierarchy(num_nodes, links)
+    elif num_nodes > ALL_PAIRS_LIMIT:
+        G, routing_paths = build_graph(num_nodes, links), None
+        landmarks = cached_landmarks(G, key)
+    else:
+        G, routing_paths = build_graph_and_paths(num_nodes, links, workers=args.workers, compact=True,
+                                                 cache_key=key)
 
     print("\n✅ Verkon rakenne luettu.")
     for u, v, w in links:
@@ -91,9 +170,20 @@ def main():
         print("❌ Virheellinen solmun numero.")
         return
 
-    path = shortest_path(start, end, routing_paths)
+    if ch is not None:
+        path = hierarchy_path(ch, start, end)
+    elif routing_paths is None:
+        path = point_to_point_path(G, start, end, landmarks)
+    else:
+        path = shortest_path(start, end, routing_paths)
     if path:
         print(f"✅ Laskettiin reitti: {path}")
+        if routing_paths is not None:
+            count, routes = equal_cost_routes(G, num_nodes, start, end)
+            if count > 1:
+                print(f"ℹ️ Yhtä lyhyitä reittejä on {count}:")
+                for route in routes:
+                    print(f" - {route}")
         animate_path(G, path)
 
 if __name__ == "__main__":
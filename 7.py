@@ -1,48 +1,190 @@
+import argparse
 import networkx as nx
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
+import heapq
 import os
+from array import array
+from itertools import islice
+from multiprocessing import Pool
 
-def read_network_from_file(filename="reittitiedosto.txt"):
-    links = set()
-    with open(filename, 'r') as f:
-        first_line = f.readline().split()
-        num_routers, num_links = int(first_line[0]), int(first_line[1])
-        for i in range(num_links):
-            line = f.readline().split()
-            if len(line) != 3:
-                continue
-            u, v, cost = map(int, line)
-            if u == v or cost <= 0 or u < 0 or v < 0 or u >= num_routers or v >= num_routers:
-                continue
-            if (u, v) in links or (v, u) in links:
-                continue
-            links.add((u, v, cost))
-    return num_routers, list(links)
+from monipolku import ecmp_dijkstra, equal_cost_paths, graph_adjacency
+from reittihaku import bidirectional_dijkstra, predecessor_and_distance_arrays, predecessor_array, reconstruct_path
+from valimuisti import cache_path, cached_network_from_file, file_key, load_arrays, save_arrays
+from verkkolukija import print_rejected
+
+# Suuremmille verkoille ei ylläpidetä kaikkien parien taulukoita, vaan jokainen kysely haetaan
+# kaksisuuntaisella Dijkstralla. Maamerkkejä (ALT) ei käytetä, koska verkko muuttuu kyselyjen välillä.
+ALL_PAIRS_LIMIT = 2000
+# Tasapelitilanteessa näytettävien yhtä lyhyiden reittien enimmäismäärä
+ECMP_SHOW = 5
+
+# Rinnakkaisajon työprosessit: verkko välitetään kerran alustuksessa, ei jokaisen lähteen mukana
+_worker_graph = None
+_worker_compact = False
 
-def build_graph_and_paths(num_nodes, links):
+def _init_worker(G, compact=False):
+    global _worker_graph, _worker_compact
+    _worker_graph = G
+    _worker_compact = compact
+
+def _paths_worker(src):
+    if _worker_compact:
+        return predecessor_array(_worker_graph, src)
+    try:
+        _, paths = nx.single_source_dijkstra(_worker_graph, src)
+        return paths
+    except nx.NetworkXNoPath:
+        return {}
+
+def _dynamic_worker(src):
+    return predecessor_and_distance_arrays(_worker_graph, src)
+
+def build_graph(num_nodes, links):
     G = nx.Graph()
     G.add_nodes_from(range(num_nodes))
     for u, v, w in links:
         G.add_edge(u, v, weight=w)
+    return G
+
+def build_graph_and_paths(num_nodes, links, workers=1, compact=False):
+    G = build_graph(num_nodes, links)
 
     routing_paths = {}
-    for src in range(num_nodes):
-        try:
-            _, paths = nx.single_source_dijkstra(G, src)
-            routing_paths[src] = paths
-        except nx.NetworkXNoPath:
-            routing_paths[src] = {}
+    if workers > 1:
+        # Lähteet jaetaan prosessipoolille; imap palauttaa tulokset solmujärjestyksessä
+        chunksize = max(1, num_nodes // (workers * 4))
+        with Pool(workers, initializer=_init_worker, initargs=(G, compact)) as pool:
+            for src, paths in enumerate(pool.imap(_paths_worker, range(num_nodes), chunksize)):
+                routing_paths[src] = paths
+    elif compact:
+        for src in range(num_nodes):
+            routing_paths[src] = predecessor_array(G, src)
+    else:
+        for src in range(num_nodes):
+            try:
+                _, paths = nx.single_source_dijkstra(G, src)
+                routing_paths[src] = paths
+            except nx.NetworkXNoPath:
+                routing_paths[src] = {}
     return G, routing_paths
 
+# Dynaaminen tila: edeltäjä- ja etäisyystaulukot pidetään ajan tasalla linkkimuutosten yli
+# Alkutila voidaan lukea välimuistista (cache_key = lähdetiedoston tiiviste); rivit kopioidaan
+# muokattaviksi taulukoiksi, koska update_graph_and_paths muuttaa niitä paikallaan.
+def build_dynamic_routing(num_nodes, links, cache_key=None, workers=1):
+    G = build_graph(num_nodes, links)
+
+    routing_paths = {}
+    distances = {}
+    cached = load_arrays(cache_path(cache_key, 'dynaaminen')) if cache_key else None
+    if cached is not None:
+        prev_all, dist_all = cached[1]['prev'], cached[1]['dist']
+        for src in range(num_nodes):
+            row = slice(src * num_nodes, (src + 1) * num_nodes)
+            routing_paths[src], distances[src] = array('i'), array('d')
+            routing_paths[src].frombytes(prev_all[row].cast('B'))
+            distances[src].frombytes(dist_all[row].cast('B'))
+        return G, routing_paths, distances
+
+    if workers > 1:
+        chunksize = max(1, num_nodes // (workers * 4))
+        with Pool(workers, initializer=_init_worker, initargs=(G,)) as pool:
+            for src, row in enumerate(pool.imap(_dynamic_worker, range(num_nodes), chunksize)):
+                routing_paths[src], distances[src] = row
+    else:
+        for src in range(num_nodes):
+            routing_paths[src], distances[src] = predecessor_and_distance_arrays(G, src)
+    if cache_key:
+        prev_all, dist_all = array('i'), array('d')
+        for src in range(num_nodes):
+            prev_all.extend(routing_paths[src])
+            dist_all.extend(distances[src])
+        save_arrays(cache_path(cache_key, 'dynaaminen'), num_nodes, prev=prev_all, dist=dist_all)
+    return G, routing_paths, distances
+
+# Lisätty tai halventunut linkki voi vain lyhentää etäisyyksiä: levitetään parannus paikallisesti
+def _relax_inserted_edge(G, prev, dist, u, v, w):
+    for a, b in ((u, v), (v, u)):
+        if dist[a] + w >= dist[b]:
+            continue
+        dist[b] = dist[a] + w
+        prev[b] = a
+        queue = [(dist[b], b)]
+        while queue:
+            d, x = heapq.heappop(queue)
+            if d > dist[x]:
+                continue
+            for y, attrs in G[x].items():
+                nd = d + attrs['weight']
+                if nd < dist[y]:
+                    dist[y] = nd
+                    prev[y] = x
+                    heapq.heappush(queue, (nd, y))
+
+# Päivittää verkon uuteen linkkilistaan; palauttaa (vanha solmumäärä, poistetut, lisätyt)
+def apply_link_changes(G, num_nodes, links):
+    old_edges = {(min(u, v), max(u, v)): w for u, v, w in G.edges(data='weight')}
+    new_edges = {}
+    for u, v, w in links:
+        new_edges[(min(u, v), max(u, v))] = w
+    # Painon muutos käsitellään poistona ja lisäyksenä
+    removed = [e for e, w in old_edges.items() if new_edges.get(e) != w]
+    added = [(u, v, w) for (u, v), w in new_edges.items() if old_edges.get((u, v)) != w]
+
+    old_num = G.number_of_nodes()
+    G.add_nodes_from(range(old_num, num_nodes))
+    G.remove_edges_from(removed)
+    for u, v, w in added:
+        G.add_edge(u, v, weight=w)
+    return old_num, removed, added
+
+def update_graph_and_paths(G, routing_paths, distances, num_nodes, links):
+    old_num, removed, added = apply_link_changes(G, num_nodes, links)
+    for src in range(old_num):
+        routing_paths[src].extend([-1] * (num_nodes - old_num))
+        distances[src].extend([float('inf')] * (num_nodes - old_num))
+
+    # Poistettu linkki koskee vain lähteitä, joiden lyhimpien polkujen puu käytti sitä
+    stale = set(range(old_num, num_nodes))
+    for src in range(old_num):
+        prev = routing_paths[src]
+        if any(prev[v] == u or prev[u] == v for u, v in removed):
+            stale.add(src)
+    for src in stale:
+        routing_paths[src], distances[src] = predecessor_and_distance_arrays(G, src)
+
+    for src in range(old_num):
+        if src in stale:
+            continue
+        for u, v, w in added:
+            _relax_inserted_edge(G, routing_paths[src], distances[src], u, v, w)
+    return G, routing_paths, distances
+
 def shortest_path(start, end, routing_paths):
-    if start in routing_paths and end in routing_paths[start]:
+    if start in routing_paths and isinstance(routing_paths[start], array):
+        path = reconstruct_path(routing_paths[start], start, end)
+        if path:
+            return path
+    elif start in routing_paths and end in routing_paths[start]:
         return routing_paths[start][end]
-    else:
+    print("❌ Reittiä ei löytynyt.")
+    return []
+
+# Kaikki yhtä lyhyet reitit (ECMP): palauttaa (reittien määrä, enintään limit reittiä)
+def equal_cost_routes(G, num_nodes, start, end, limit=ECMP_SHOW):
+    _, _, counts, preds = ecmp_dijkstra(graph_adjacency(G, num_nodes), start, keep_preds=True)
+    return counts[end], list(islice(equal_cost_paths(preds, start, end), limit))
+
+def point_to_point_path(G, start, end):
+    _, path = bidirectional_dijkstra(G, start, end)
+    if not path:
         print("❌ Reittiä ei löytynyt.")
-        return []
+    return path
 
+# matplotlib tuodaan vasta kutsuttaessa, jotta reitityslaskenta käynnistyy ilman sitä
 def animate_path(G, path):
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+
     #pos = nx.spring_layout(G, seed=42)
     pos = nx.spring_layout(G, seed=42, k=1.0, iterations=200)
     fig, ax = plt.subplots()
@@ -126,16 +268,27 @@ def prompt_modify_network(num_nodes, links):
         else:
             print("❌ Tuntematon valinta.")
 
-def main():
+# Pääohjelma; --workers N laskee alkutilan reititystaulut N prosessilla
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dynaaminen reititys reittitiedosto.txt-verkossa")
+    parser.add_argument('--workers', type=int, default=1, help="rinnakkaisten prosessien määrä (oletus 1)")
+    args = parser.parse_args(argv)
+
     if not os.path.exists("reittitiedosto.txt"):
         print("❌ Tiedostoa 'reittitiedosto.txt' ei löytynyt.")
         return
 
-    num_nodes, links = read_network_from_file("reittitiedosto.txt")
+    key = file_key("reittitiedosto.txt")
+    rejected = []
+    num_nodes, links = cached_network_from_file("reittitiedosto.txt", rejected, key)
+    print_rejected(rejected)
+    point_queries = num_nodes > ALL_PAIRS_LIMIT
+    if point_queries:
+        G = build_graph(num_nodes, links)
+    else:
+        G, routing_paths, distances = build_dynamic_routing(num_nodes, links, cache_key=key, workers=args.workers)
 
     while True:
-        G, routing_paths = build_graph_and_paths(num_nodes, links)
-
         print("\n✅ Verkon rakenne:")
         for u, v, w in links:
             print(f" - {u} <--> {v} (etäisyys {w})")
@@ -149,7 +302,10 @@ def main():
             print("❌ Virheellinen solmun numero.")
             continue
 
-        path = shortest_path(start, end, routing_paths)
+        if point_queries:
+            path = point_to_point_path(G, start, end)
+        else:
+            path = shortest_path(start, end, routing_paths)
         #if path:
         #    print(f"✅ Laskettiin reitti: {path}")
         #    animate_path(G, path)
@@ -173,10 +329,21 @@ def main():
             expression = " + ".join(distance_parts) + f" = {total_distance}"
 
             print(f"✅ Laskettiin reitti: {path} (etäisyys: {expression})")
+            if not point_queries:
+                count, routes = equal_cost_routes(G, num_nodes, start, end)
+                if count > 1:
+                    print(f"ℹ️ Yhtä lyhyitä reittejä on {count}:")
+                    for route in routes:
+                        print(f" - {route}")
             animate_path(G, path)
 
 
         num_nodes, links = prompt_modify_network(num_nodes, links)
+        # Päivitetään vain muutosten koskemat reitit koko verkon uudelleenlaskennan sijaan
+        if point_queries:
+            apply_link_changes(G, num_nodes, links)
+        else:
+            G, routing_paths, distances = update_graph_and_paths(G, routing_paths, distances, num_nodes, links)
 
 if __name__ == "__main__":
     main()
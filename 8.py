@@ -1,39 +1,122 @@
-import networkx as nx
-import matplotlib.pyplot as plt
-
-# Luo painotettu verkko (paino simuloi portin prioriteettia tai linkin kustannusta)
-G = nx.Graph()
-G.add_weighted_edges_from([
-    ('A', 'B', 4),
-    ('A', 'C', 2),
-    ('B', 'C', 1),
-    ('B', 'D', 5),
-    ('C', 'D', 6),
-    ('C', 'E', 10),
-    ('D', 'E', 2),
-    ('D', 'F', 6),
-    ('E', 'F', 3),
-])
-
-# Spanning tree (Kruskalin algoritmi)
-T = nx.minimum_spanning_tree(G, algorithm="kruskal")
-
-# Piirrä alkuperäinen verkko
-pos = nx.spring_layout(G, seed=42)
-plt.figure(figsize=(12, 6))
-
-plt.subplot(121)
-nx.draw(G, pos, with_labels=True, node_color='lightblue', edge_color='gray', node_size=1200)
-edge_labels = nx.get_edge_attributes(G, 'weight')
-nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels)
-plt.title("Alkuperäinen verkko")
-
-# Piirrä spanning tree
-plt.subplot(122)
-nx.draw(T, pos, with_labels=True, node_color='lightgreen', edge_color='black', node_size=1200)
-edge_labels = nx.get_edge_attributes(T, 'weight')
-nx.draw_networkx_edge_labels(T, pos, edge_labels=edge_labels)
-plt.title("Spanning Tree")
-
-plt.tight_layout()
-plt.show()
+# Virittävä puu (spanning tree): esimerkkiverkon piirto tai verkko.txt-muotoisen topologian puu.
+#
+#   python 8.py                       piirrä esimerkkiverkko ja sen virittävä puu
+#   python 8.py verkko.txt [puu.txt]  laske puu tiedoston topologialle (tallennetaan verkko.txt-muodossa)
+#   python 8.py verkko.txt [puu.txt] --events muutokset.txt
+#                                     toista linkkimuutokset ("+ u v paino", "- u v", "= u v paino")
+#                                     ja päivitä puuta muutos kerrallaan ilman uudelleenlaskentaa
+import argparse
+import importlib
+import time
+
+kruskal_module = importlib.import_module('9')
+
+# Virittävä puu (tai metsä, jos verkko ei ole yhtenäinen) tiedoston topologialle ilman networkx:ää
+def spanning_tree_from_file(filename, output=None):
+    from valimuisti import cached_network_arrays
+    from verkkolukija import print_rejected
+
+    start = time.perf_counter()
+    num_nodes, us, vs, costs, rejected = cached_network_arrays(filename)
+    print_rejected(rejected)
+    tree = kruskal_module.kruskal_arrays(num_nodes, us, vs, costs)
+    total = sum(costs[i] for i in tree)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Virittävä puu: {num_nodes} reititintä, {len(costs)} linkkiä, {len(tree)} puun linkkiä, "
+          f"kokonaispaino {total} ({elapsed:.2f} s)")
+    components = num_nodes - len(tree)
+    if components > 1:
+        print(f"ℹ️ Verkko ei ole yhtenäinen: virittävä metsä, jossa {components} komponenttia")
+    if output:
+        with open(output, 'w', buffering=1 << 20) as f:
+            f.write(f"{num_nodes} {len(tree)}\n")
+            f.writelines(f"{us[i]} {vs[i]} {costs[i]}\n" for i in tree)
+    return tree
+
+# Toistaa tapahtumatiedoston muutokset dynaamiseen puuhun
+def replay_from_file(filename, events_path, output=None):
+    from valimuisti import cached_network_arrays
+    from verkkolukija import print_rejected
+    from virityspuu import DynamicSpanningTree, replay_events
+
+    start = time.perf_counter()
+    num_nodes, us, vs, costs, rejected = cached_network_arrays(filename)
+    print_rejected(rejected)
+    tree = DynamicSpanningTree(num_nodes, us, vs, costs)
+    built = time.perf_counter()
+    print(f"✅ Alkupuu: {tree.tree_links} puun linkkiä, kokonaispaino {tree.total_weight} ({built - start:.2f} s)")
+
+    bad_events = []
+    events, changes = replay_events(tree, events_path, bad_events)
+    print_rejected(bad_events)
+    elapsed = time.perf_counter() - built
+    print(f"✅ {events} muutosta, joista {changes} muutti puuta ({elapsed:.2f} s); "
+          f"puussa {tree.tree_links} linkkiä, kokonaispaino {tree.total_weight}")
+    if tree.components > 1:
+        print(f"ℹ️ Verkko ei ole yhtenäinen: virittävä metsä, jossa {tree.components} komponenttia")
+    if output:
+        with open(output, 'w', buffering=1 << 20) as f:
+            f.write(f"{num_nodes} {tree.tree_links}\n")
+            f.writelines(f"{v} {u} {w}\n" for u, v, w in tree.tree_edges())
+    return tree
+
+def main():
+    import networkx as nx
+    import matplotlib.pyplot as plt
+
+    # Luo painotettu verkko (paino simuloi portin prioriteettia tai linkin kustannusta)
+    G = nx.Graph()
+    G.add_weighted_edges_from([
+        ('A', 'B', 4),
+        ('A', 'C', 2),
+        ('B', 'C', 1),
+        ('B', 'D', 5),
+        ('C', 'D', 6),
+        ('C', 'E', 10),
+        ('D', 'E', 2),
+        ('D', 'F', 6),
+        ('E', 'F', 3),
+    ])
+
+    # Spanning tree (Kruskalin algoritmi)
+    nodes = list(G.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = [(index[u], index[v], w) for u, v, w in G.edges(data='weight')]
+    T = nx.Graph()
+    T.add_nodes_from(nodes)
+    T.add_weighted_edges_from(kruskal_module.kruskal(nodes, edges))
+
+    # Piirrä alkuperäinen verkko
+    pos = nx.spring_layout(G, seed=42)
+    plt.figure(figsize=(12, 6))
+
+    plt.subplot(121)
+    nx.draw(G, pos, with_labels=True, node_color='lightblue', edge_color='gray', node_size=1200)
+    edge_labels = nx.get_edge_attributes(G, 'weight')
+    nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels)
+    plt.title("Alkuperäinen verkko")
+
+    # Piirrä spanning tree
+    plt.subplot(122)
+    nx.draw(T, pos, with_labels=True, node_color='lightgreen', edge_color='black', node_size=1200)
+    edge_labels = nx.get_edge_attributes(T, 'weight')
+    nx.draw_networkx_edge_labels(T, pos, edge_labels=edge_labels)
+    plt.title("Spanning Tree")
+
+    plt.tight_layout()
+    plt.show()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Virittävä puu esimerkkiverkolle tai topologiatiedostolle")
+    parser.add_argument('topology', nargs='?', help="verkko.txt-muotoinen topologiatiedosto (oletus: piirrä esimerkki)")
+    parser.add_argument('output', nargs='?', help="puun tallennuspolku verkko.txt-muodossa")
+    parser.add_argument('--events', help="linkkimuutosten tapahtumatiedosto")
+    args = parser.parse_args()
+    if args.events and not args.topology:
+        parser.error("--events vaatii topologiatiedoston")
+    if args.events:
+        replay_from_file(args.topology, args.events, args.output)
+    elif args.topology:
+        spanning_tree_from_file(args.topology, args.output)
+    else:
+        main()
@@ -1,5 +1,12 @@
-import networkx as nx
-import matplotlib.pyplot as plt
+import sys
+from array import array
+
+from osoitteet import UNICAST, classify_ipv4, parse_addresses, read_addresses
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # ARP-taulun IP-osoitteet
 raw_ip_list = [
@@ -10,114 +17,230 @@ raw_ip_list = [
     "10.10.216.24"
 ]
 
-def ip_to_int(ip):
-    return sum(int(octet) << (8 * i) for i, octet in enumerate(reversed(ip.split('.'))))
-
-def is_multicast_or_broadcast(ip):
-    first_octet = int(ip.split('.')[0])
-    return (
-        (224 <= first_octet <= 239) or
-        ip == "255.255.255.255"
-    )
-
-# Erotellaan solmut
-unicast_ips = [ip for ip in raw_ip_list if not is_multicast_or_broadcast(ip)]
-blocked_ips = [ip for ip in raw_ip_list if is_multicast_or_broadcast(ip)]
-
-# Reunat unicastien välillä
-edges = []
-for i in range(len(unicast_ips)):
-    for j in range(i + 1, len(unicast_ips)):
-        ip1 = ip_to_int(unicast_ips[i])
-        ip2 = ip_to_int(unicast_ips[j])
-        weight = abs(ip1 - ip2)
-        edges.append((i, j, weight))
+def int_to_ip(value):
+    return f"{value >> 24}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}"
+
+# Järjestetyt, erilliset unicast-osoitteet sekä suodatettujen (multicast, broadcast ja varatut) osoitteiden määrä
+def sorted_unicast(addresses):
+    categories = classify_ipv4(addresses)
+    if np is not None:
+        values = np.frombuffer(addresses, dtype=np.uint32) if isinstance(addresses, array) \
+            else np.asarray(addresses, dtype=np.uint32)
+        unicast = categories == UNICAST
+        values = np.sort(values[unicast])
+        if len(values):
+            values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+        return array('I', values.tobytes()), len(unicast) - int(np.count_nonzero(unicast))
+    unicast = [x for x, category in zip(addresses, categories) if category == UNICAST]
+    return array('I', sorted(set(unicast))), len(addresses) - len(unicast)
+
+# Virittävä puu, kun paino on osoitteiden erotus: pisteiden minimipuu suoralla on järjestyksessä
+# vierekkäisten osoitteiden ketju, joten täyttä verkkoa ja Kruskalia ei tarvita (O(n log n)).
+# Tuottaa reunat (osoite1, osoite2, paino) kokonaislukuina.
+def chain_spanning_tree(ordered):
+    for i in range(1, len(ordered)):
+        yield ordered[i - 1], ordered[i], ordered[i] - ordered[i - 1]
 
 # Kruskalin algoritmi
 class UnionFind:
+    """Yhdistä–etsi taulukoissa: yhdistäminen asteen (rank) mukaan ja polun tiivistys."""
+
     def __init__(self, n):
-        self.parent = list(range(n))
+        self.parent = array('q', range(n))
+        self.rank = array('B', bytes(n))
 
     def find(self, x):
-        while x != self.parent[x]:
-            self.parent[x] = self.parent[self.parent[x]]
-            x = self.parent[x]
-        return x
+        parent = self.parent
+        root = x
+        while root != parent[root]:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
 
     def union(self, x, y):
         xr, yr = self.find(x), self.find(y)
         if xr == yr:
             return False
+        rank = self.rank
+        if rank[xr] < rank[yr]:
+            xr, yr = yr, xr
         self.parent[yr] = xr
+        if rank[xr] == rank[yr]:
+            rank[xr] += 1
         return True
 
+# Virittävä metsä reunataulukoista (us, vs, painot); palauttaa valittujen reunojen indeksit painojärjestyksessä.
+# NumPyllä reunat järjestetään argsortilla ja käsitellään kasvavina erinä: erän alussa jokaisen solmun
+# juuri lasketaan vektoroidusti, ja reunat, joiden päät ovat jo samassa puussa, pudotetaan ennen
+# Python-silmukkaa. Tulos on sama kuin reunat yksitellen käsittelevällä Kruskalilla.
+def kruskal_arrays(num_nodes, us, vs, weights):
+    if np is None:
+        order = sorted(range(len(weights)), key=weights.__getitem__)
+        uf = UnionFind(num_nodes)
+        tree = array('q')
+        for i in order:
+            if uf.union(us[i], vs[i]):
+                tree.append(i)
+                if len(tree) == num_nodes - 1:
+                    break
+        return tree
+
+    us = np.asarray(us, dtype=np.int64)
+    vs = np.asarray(vs, dtype=np.int64)
+    order = np.argsort(np.asarray(weights), kind='stable')
+    parent = np.arange(num_nodes, dtype=np.int64)
+    rank = np.zeros(num_nodes, dtype=np.uint8)
+    # Silmukka lukee ja kirjoittaa samoja puskureita memoryview-näkymien kautta
+    parents, ranks = memoryview(parent), memoryview(rank)
+    tree = array('q')
+    start, batch = 0, max(num_nodes, 1)
+    while start < len(order) and len(tree) < num_nodes - 1:
+        edges = order[start:start + batch]
+        start += batch
+        batch *= 2
+        # Polut tiivistetään kokonaan: jokainen solmu osoittaa suoraan juureensa
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent[:] = grand
+        edges = edges[parent[us[edges]] != parent[vs[edges]]]
+        for i, x, y in zip(edges.tolist(), us[edges].tolist(), vs[edges].tolist()):
+            while x != parents[x]:
+                x = parents[x]
+            while y != parents[y]:
+                y = parents[y]
+            if x == y:
+                continue
+            if ranks[x] < ranks[y]:
+                x, y = y, x
+            parents[y] = x
+            if ranks[x] == ranks[y]:
+                ranks[x] += 1
+            tree.append(i)
+            if len(tree) == num_nodes - 1:
+                break
+    return tree
+
 def kruskal(nodes, edges):
-    uf = UnionFind(len(nodes))
-    edges.sort(key=lambda x: x[2])
-    mst = []
-    for u, v, weight in edges:
-        if uf.union(u, v):
-            mst.append((nodes[u], nodes[v], weight))
-    return mst
-
-# Laske MST
-mst = kruskal(unicast_ips, edges)
-
-# Graafi
-G = nx.Graph()
-
-# Solmut
-for ip in unicast_ips:
-    G.add_node(ip, color='green')
-for ip in blocked_ips:
-    G.add_node(ip, color='red')
-
-# Kaikki mahdolliset reunat unicastien välillä
-for i in range(len(unicast_ips)):
-    for j in range(i + 1, len(unicast_ips)):
-        ip1 = unicast_ips[i]
-        ip2 = unicast_ips[j]
-        weight = abs(ip_to_int(ip1) - ip_to_int(ip2))
-        G.add_edge(ip1, ip2, weight=weight, style='dotted', color='gray', width=1)
-
-# Korostetaan MST-reunat
-for u, v, w in mst:
-    G[u][v]['style'] = 'solid'
-    G[u][v]['color'] = 'black'
-    G[u][v]['width'] = 2
-
-# Käytä spring_layoutia, joka ottaa huomioon painot
-pos = nx.spring_layout(G, weight='weight', seed=42, k=0.7, iterations=200)
-
-# Värit, tyylit ja leveydet
-node_colors = [G.nodes[n]['color'] for n in G.nodes]
-edge_colors = [G[u][v]['color'] for u, v in G.edges]
-edge_styles = [G[u][v]['style'] for u, v in G.edges]
-edge_widths = [G[u][v]['width'] for u, v in G.edges]
-
-# Piirto
-plt.figure(figsize=(12, 8))
-nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=800)
-nx.draw_networkx_labels(G, pos, font_size=8, font_weight='bold')
-
-# Piirrä reunat eri tyyleillä
-for style in set(edge_styles):
-    styled_edges = [(u, v) for u, v in G.edges if G[u][v]['style'] == style]
-    styled_colors = [G[u][v]['color'] for u, v in styled_edges]
-    styled_widths = [G[u][v]['width'] for u, v in styled_edges]
-    nx.draw_networkx_edges(
-        G, pos,
-        edgelist=styled_edges,
-        style=style,
-        edge_color=styled_colors,
-        width=styled_widths
-    )
-
-# Näytä MST-reunojen painot
-edge_labels = {(u, v): G[u][v]['weight'] for u, v in G.edges if G[u][v]['color'] == 'black'}
-nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels)
-
-plt.title("Spanning Tree")
-plt.axis('off')
-plt.tight_layout()
-plt.show()
+    if not edges:
+        return []
+    us, vs, weights = zip(*edges)
+    return [(nodes[us[i]], nodes[vs[i]], weights[i]) for i in kruskal_arrays(len(nodes), us, vs, weights)]
+
+def main():
+    # Piirtokirjastot tuodaan vasta täällä, jotta kruskal() on käytettävissä ilman niitä
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
+    from verkkolukija import print_rejected
+
+    # Erotellaan solmut: osoitteet muunnetaan ja luokitellaan kerralla. parse_addresses jättää
+    # virheelliset ja IPv6-osoitteet pois IPv4-taulukosta, joten ne ohitetaan myös merkkijonoista,
+    # jotta jokainen nimi osuu omaan osoitteeseensa.
+    addresses, _, _, rejected = parse_addresses(raw_ip_list)
+    skipped = {line_no - 1 for line_no, _, _ in rejected}
+    for i, ip in enumerate(raw_ip_list):
+        if i not in skipped and ':' in ip.split()[0]:
+            skipped.add(i)
+            rejected.append((i + 1, ip, "IPv6-osoite"))
+    print_rejected(sorted(rejected))
+    ipv4_list = [ip for i, ip in enumerate(raw_ip_list) if i not in skipped]
+    if len(ipv4_list) != len(addresses):
+        raise ValueError(f"osoitteita {len(addresses)}, nimiä {len(ipv4_list)}")
+    unicast_ips, blocked_ips, values = [], [], []
+    for ip, value, category in zip(ipv4_list, addresses, classify_ipv4(addresses)):
+        if category == UNICAST:
+            unicast_ips.append(ip)
+            values.append(value)
+        else:
+            blocked_ips.append(ip)
+
+    # MST on järjestettyjen osoitteiden ketju
+    names = dict(zip(values, unicast_ips))
+    mst = [(names[u], names[v], w) for u, v, w in chain_spanning_tree(sorted(set(values)))]
+
+    # Graafi
+    G = nx.Graph()
+
+    # Solmut
+    for ip in unicast_ips:
+        G.add_node(ip, color='green')
+    for ip in blocked_ips:
+        G.add_node(ip, color='red')
+
+    # Kaikki mahdolliset reunat unicastien välillä
+    for i in range(len(unicast_ips)):
+        for j in range(i + 1, len(unicast_ips)):
+            ip1 = unicast_ips[i]
+            ip2 = unicast_ips[j]
+            weight = abs(values[i] - values[j])
+            G.add_edge(ip1, ip2, weight=weight, style='dotted', color='gray', width=1)
+
+    # Korostetaan MST-reunat
+    for u, v, w in mst:
+        G[u][v]['style'] = 'solid'
+        G[u][v]['color'] = 'black'
+        G[u][v]['width'] = 2
+
+    # Käytä spring_layoutia, joka ottaa huomioon painot
+    pos = nx.spring_layout(G, weight='weight', seed=42, k=0.7, iterations=200)
+
+    # Värit, tyylit ja leveydet
+    node_colors = [G.nodes[n]['color'] for n in G.nodes]
+    edge_colors = [G[u][v]['color'] for u, v in G.edges]
+    edge_styles = [G[u][v]['style'] for u, v in G.edges]
+    edge_widths = [G[u][v]['width'] for u, v in G.edges]
+
+    # Piirto
+    plt.figure(figsize=(12, 8))
+    nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=800)
+    nx.draw_networkx_labels(G, pos, font_size=8, font_weight='bold')
+
+    # Piirrä reunat eri tyyleillä
+    for style in set(edge_styles):
+        styled_edges = [(u, v) for u, v in G.edges if G[u][v]['style'] == style]
+        styled_colors = [G[u][v]['color'] for u, v in styled_edges]
+        styled_widths = [G[u][v]['width'] for u, v in styled_edges]
+        nx.draw_networkx_edges(
+            G, pos,
+            edgelist=styled_edges,
+            style=style,
+            edge_color=styled_colors,
+            width=styled_widths
+        )
+
+    # Näytä MST-reunojen painot
+    edge_labels = {(u, v): G[u][v]['weight'] for u, v in G.edges if G[u][v]['color'] == 'black'}
+    nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels)
+
+    plt.title("Spanning Tree")
+    plt.axis('off')
+    plt.tight_layout()
+    plt.show()
+
+# ARP-tila suurille tauluille: python 9.py arp.txt [puu.txt]; ei piirretä eikä muodosteta täyttä verkkoa.
+# Virittävä puu lasketaan IPv4-osoitteille.
+def arp_tree_main(filename, output=None):
+    from verkkolukija import print_rejected
+
+    addresses, ipv6_high, _, rejected = read_addresses(filename)
+    print_rejected(rejected)
+    ordered, blocked = sorted_unicast(addresses)
+    total = ordered[-1] - ordered[0] if ordered else 0
+    print(f"✅ Virittävä puu: {len(ordered)} unicast-osoitetta, {max(len(ordered) - 1, 0)} reunaa, "
+          f"kokonaispaino {total}")
+    if blocked:
+        print(f"ℹ️ Suodatettiin {blocked} multicast-, broadcast- tai varattua osoitetta")
+    if ipv6_high:
+        print(f"ℹ️ Ohitettiin {len(ipv6_high)} IPv6-osoitetta")
+    if output:
+        with open(output, 'w', buffering=1 << 20) as f:
+            f.writelines(f"{int_to_ip(u)} {int_to_ip(v)} {w}\n" for u, v, w in chain_spanning_tree(ordered))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        arp_tree_main(*sys.argv[1:3])
+    else:
+        main()
@@ -0,0 +1,523 @@
+# Tapahtumapohjainen BGP-simulaattori: reitittimet lähettävät toisilleen vain muuttuneet reitit
+# (UPDATE) ja poistot (withdraw) diskreetin tapahtumajonon kautta ilman odottelua. Simulaatio
+# päättyy, kun jono tyhjenee eli verkko on konvergoitunut.
+#
+# Tallennus on tiivis, jotta täydet reititystaulut mahtuvat muistiin:
+# - etuliitteet ovat simulaattorin yhteisessä PrefixTable-taulussa kokonaislukuina (versio,
+#   verkko, pituus), ja jokainen etuliite saa pysyvän indeksin;
+# - reitin attribuutit ovat yhteisen AttributeTable-taulun rinnakkaisissa taulukoissa. AS-polku on
+#   ketju: viety attribuutti viittaa lähettäjän parhaaseen attribuuttiin, joten polun yhteiset
+#   loppuosat tallennetaan vain kerran;
+# - reititin pitää etuliitteen indeksillä järjestettyjä array('i')-taulukoita attribuuttien
+#   indekseistä: paras reitti (Loc-RIB) ja jokaiselta naapurilta saatu reitti (Adj-RIB-In).
+#
+# Reitinvalinta: pienin kustannus, sitten lyhin AS-polku, sitten pienin naapurin AS-numero.
+# Järjestys on pakattu attribuutin preferenssilukuun (rank), joten vertailu on yksi kokonaislukuvertailu.
+# Kustannus välitetään naapurille sellaisenaan kuten alkuperäisessä BGPRouterissa; AS-polku estää
+# silmukat, sillä reititin hylkää reitin, jonka polulla se jo on.
+#
+# Pelkillä poistoilla BGP kokeilee vanhentuneita vaihtoehtoisia polkuja yksi kerrallaan, ja viestien
+# määrä kasvaa räjähdysmäisesti. Siksi alkuperäisen reitittimen poisto kulkee verkossa syyn kanssa:
+# syy on poistetun oman reitin attribuutti (alkuperä-AS, epookki), ja vastaanottaja poistaa kerralla
+# kaikki saman alkuperän vanhemmat reitit etuliitteelle. Uudelleen ilmoitettu reitti saa uuden
+# epookin, joten aiempi poisto ei koske sitä.
+#
+# Jonossa odottavat viestit ovat etuliite- ja attribuuttitaulukoita; ne muutetaan sanakirjoiksi
+# vasta toimitettaessa, joten suurenkaan verkon jono ei vie paljon muistia.
+import gc
+import heapq
+import ipaddress
+from array import array
+from collections import namedtuple
+
+from edelleenlahetys import NO_ROUTE, ForwardingTable
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Paikallisesti alkunsa saaneen reitin lähde apply-kutsussa
+LOCAL = None
+
+# Preferenssiluku: kustannus << COST_SHIFT | AS-polun pituus << LENGTH_SHIFT | ensimmäinen AS
+COST_SHIFT = 44
+LENGTH_SHIFT = 32
+MAX_COST = (1 << (63 - COST_SHIFT)) - 1
+MAX_PATH_LENGTH = (1 << (COST_SHIFT - LENGTH_SHIFT)) - 1
+
+SimulationStats = namedtuple('SimulationStats', ['messages', 'updates', 'changes', 'time'])
+
+class PrefixTable:
+    """Etuliitteet kokonaislukuina; IPv6-verkko tallennetaan kahtena 64-bittisenä puolikkaana."""
+
+    def __init__(self):
+        self.index = {}  # pakattu avain -> indeksi
+        self.version = array('B')
+        self.length = array('B')
+        self.network_high = array('Q')
+        self.network_low = array('Q')
+
+    def __len__(self):
+        return len(self.length)
+
+    @staticmethod
+    def _key(network):
+        return (int(network.network_address) << 8 | network.prefixlen) << 1 | (network.version == 6)
+
+    def intern(self, prefix):
+        network = ipaddress.ip_network(prefix, strict=False)
+        key = self._key(network)
+        i = self.index.get(key)
+        if i is None:
+            i = self.index[key] = len(self.length)
+            address = int(network.network_address)
+            self.version.append(network.version)
+            self.length.append(network.prefixlen)
+            self.network_high.append(address >> 64)
+            self.network_low.append(address & 0xFFFFFFFFFFFFFFFF)
+        return i
+
+    def find(self, prefix):
+        return self.index.get(self._key(ipaddress.ip_network(prefix, strict=False)))
+
+    def network(self, i):
+        """(versio, verkko, pituus) indeksille i."""
+        return self.version[i], self.network_high[i] << 64 | self.network_low[i], self.length[i]
+
+    def name(self, i):
+        version, network, length = self.network(i)
+        cls = ipaddress.IPv4Network if version == 4 else ipaddress.IPv6Network
+        return str(cls((network, length)))
+
+class AttributeTable:
+    """Reittien attribuutit rinnakkaisissa taulukoissa; attribuutteja ei poisteta simulaation aikana."""
+
+    def __init__(self):
+        self.rank = array('q')
+        self.parent = array('i')  # lähettäjän attribuutti, NO_ROUTE = paikallinen reitti
+        self.asn = array('I')     # viejän AS (paikallisella reitillä alkuperä)
+        self.origin = array('I')
+        self.epoch = array('I')
+
+    def __len__(self):
+        return len(self.rank)
+
+    def _append(self, rank, parent, asn, origin, epoch):
+        self.rank.append(rank)
+        self.parent.append(parent)
+        self.asn.append(asn)
+        self.origin.append(origin)
+        self.epoch.append(epoch)
+        return len(self.rank) - 1
+
+    def local(self, asn, cost, epoch):
+        if not isinstance(cost, int) or not 0 <= cost <= MAX_COST:
+            raise ValueError(f"kustannuksen on oltava kokonaisluku väliltä 0..{MAX_COST}: {cost!r}")
+        return self._append(cost << COST_SHIFT, NO_ROUTE, asn, asn, epoch)
+
+    def extend(self, attr, asn):
+        """Attribuutti, jonka AS asn vie naapureilleen (polun alkuun lisätään asn)."""
+        rank = self.rank[attr]
+        length = ((rank >> LENGTH_SHIFT) & MAX_PATH_LENGTH) + 1
+        if length > MAX_PATH_LENGTH:
+            raise OverflowError("AS-polku on liian pitkä")
+        return self._append((rank >> COST_SHIFT << COST_SHIFT) | length << LENGTH_SHIFT | asn,
+                            attr, asn, self.origin[attr], self.epoch[attr])
+
+    def cost(self, attr):
+        return self.rank[attr] >> COST_SHIFT
+
+    def path(self, attr):
+        path = []
+        while self.parent[attr] != NO_ROUTE:
+            path.append(self.asn[attr])
+            attr = self.parent[attr]
+        return path
+
+    def stale(self, attr, cause):
+        """Koskeeko poiston syy (poistettu oma reitti) reittiä attr."""
+        return self.origin[attr] == self.origin[cause] and self.epoch[attr] <= self.epoch[cause]
+
+    def on_path(self, attr, asn):
+        parent, asns = self.parent, self.asn
+        while attr != NO_ROUTE:
+            if asns[attr] == asn:
+                return True
+            attr = parent[attr]
+        return False
+
+    def same(self, a, b):
+        """Onko kahdella attribuutilla sama kustannus ja AS-polku."""
+        while a != b:
+            if a == NO_ROUTE or b == NO_ROUTE or self.rank[a] != self.rank[b] or self.asn[a] != self.asn[b]:
+                return False
+            a, b = self.parent[a], self.parent[b]
+        return True
+
+# Etuliitteiden indeksit, joissa kaksi Loc-RIB-taulukkoa eroavat (lyhyempi täydennetään tyhjillä)
+def rib_diff(old, new):
+    if len(old) != len(new):
+        size = max(len(old), len(new))
+        old = old + array('i', [NO_ROUTE]) * (size - len(old))
+        new = new + array('i', [NO_ROUTE]) * (size - len(new))
+    if np is not None:
+        return np.flatnonzero(np.frombuffer(old, dtype=np.int32) != np.frombuffer(new, dtype=np.int32)).tolist()
+    return [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+
+class BGPRouter:
+    __slots__ = ('operator_name', 'as_number', 'peers', 'peer_slots', 'prefixes', 'attributes',
+                 'local', 'rib_in', 'best', 'best_source', 'fib')
+
+    def __init__(self, operator_name, as_number):
+        self.operator_name = operator_name  # Käytetään operaattorin nimeä AS:n sijasta
+        self.as_number = as_number  # AS-numero
+        self.peers = []
+        self.peer_slots = {}  # naapuri -> indeksi peers- ja rib_in-listoissa
+        self.prefixes = self.attributes = None  # simulaattorin yhteiset taulut (bind)
+        self.local = {}  # omat reitit: etuliite -> attribuutti
+        self.rib_in = []  # naapureittain: etuliite -> attribuutti tai NO_ROUTE
+        self.best = array('i')  # etuliite -> paras attribuutti tai NO_ROUTE
+        self.best_source = array('i')  # parhaan reitin naapuri, -1 = oma reitti
+        self.fib = None  # edelleenlähetystaulu, kun enable_fib on kutsuttu
+
+    def add_peer(self, peer):
+        """Lisää BGP-naapuri (peer)."""
+        self.peer_slots[peer] = len(self.peers)
+        self.peers.append(peer)
+        self.rib_in.append(array('i', [NO_ROUTE]) * len(self.best))
+
+    def bind(self, prefixes, attributes):
+        self.prefixes = prefixes
+        self.attributes = attributes
+
+    def _grow(self):
+        block = array('i', [NO_ROUTE]) * (len(self.prefixes) - len(self.best))
+        self.best.extend(block)
+        self.best_source.extend(block)
+        for adj in self.rib_in:
+            adj.extend(block)
+
+    @property
+    def routing_table(self):
+        """Parhaiden reittien kustannukset etuliitteittäin."""
+        if self.prefixes is None:
+            return {}
+        cost = self.attributes.cost
+        return {self.prefixes.name(prefix): cost(attr) for prefix, attr in enumerate(self.best) if attr != NO_ROUTE}
+
+    def snapshot(self):
+        """Kopio parhaista reiteistä myöhempää vertailua (changes_since) varten."""
+        return array('i', self.best)
+
+    def changes_since(self, snapshot):
+        """Muuttuneet reitit tilannekuvan jälkeen: [(etuliite, vanha kustannus, uusi kustannus)], None = ei reittiä."""
+        attributes = self.attributes
+        changed = []
+        for prefix in rib_diff(snapshot, self.best):
+            old = snapshot[prefix] if prefix < len(snapshot) else NO_ROUTE
+            new = self.best[prefix]
+            # Sama reitti voi saapua uudelleen uutena attribuuttina; sisältö ratkaisee
+            if attributes.same(old, new):
+                continue
+            changed.append((self.prefixes.name(prefix),
+                            None if old == NO_ROUTE else attributes.cost(old),
+                            None if new == NO_ROUTE else attributes.cost(new)))
+        return changed
+
+    def _next_hop(self, prefix):
+        source = self.best_source[prefix]
+        return self if source < 0 else self.peers[source]
+
+    def enable_fib(self):
+        """Rakenna edelleenlähetystaulu parhaista reiteistä; se päivittyy tämän jälkeen muutosten mukana.
+
+        Seuraava hyppy on naapurireititin tai reititin itse paikallisille etuliitteille.
+        """
+        self.fib = ForwardingTable()
+        for prefix, attr in enumerate(self.best):
+            if attr != NO_ROUTE:
+                self.fib.insert(self.prefixes.network(prefix), self._next_hop(prefix))
+        return self.fib
+
+    def lookup(self, address):
+        """Seuraava hyppy osoitteelle pisimmän etuliitteen mukaan (None = ei reittiä)."""
+        if self.fib is None:
+            self.enable_fib()
+        return self.fib.lookup(address)
+
+    def _update_fib(self, changes):
+        fib, network = self.fib, self.prefixes.network
+        for prefix, (_, new) in changes.items():
+            if new == NO_ROUTE:
+                fib.remove(network(prefix))
+            else:
+                fib.insert(network(prefix), self._next_hop(prefix))
+
+    # Paras reitti valitaan uudelleen kaikkien lähteiden reiteistä, kun nykyinen huononi tai poistui
+    def _reselect(self, prefix, current, changes):
+        rank = self.attributes.rank
+        best_attr = self.local.get(prefix, NO_ROUTE)
+        best_source = -1
+        for slot, adj in enumerate(self.rib_in):
+            attr = adj[prefix]
+            if attr != NO_ROUTE and (best_attr == NO_ROUTE or rank[attr] < rank[best_attr]):
+                best_attr, best_source = attr, slot
+        self.best[prefix] = best_attr
+        self.best_source[prefix] = best_source
+        if best_attr != current:
+            changes[prefix] = (current, best_attr)
+
+    def apply(self, source, updates, causes=None):
+        """Käsittele lähteen muutokset {etuliite: attribuutti tai NO_ROUTE} ja poistojen syyt {etuliite: attribuutti}.
+
+        Palauttaa (muutokset, syyt): muuttuneet parhaat reitit {etuliite: (vanha, uusi)} sekä
+        naapureille edelleen välitettävät poistojen syyt.
+        """
+        if len(self.best) < len(self.prefixes):
+            self._grow()
+        attributes = self.attributes
+        rank, origin, epoch = attributes.rank, attributes.origin, attributes.epoch
+        stale_for = attributes.stale
+        best, best_source = self.best, self.best_source
+        changes = {}
+        forwarded = {}
+        if causes:
+            for prefix, cause in causes.items():
+                cause_asn, cause_epoch = origin[cause], epoch[cause]
+                stale = []
+                for slot, adj in enumerate(self.rib_in):
+                    attr = adj[prefix]
+                    if attr != NO_ROUTE and origin[attr] == cause_asn and epoch[attr] <= cause_epoch:
+                        adj[prefix] = NO_ROUTE
+                        stale.append(slot)
+                if not stale:
+                    continue
+                forwarded[prefix] = cause
+                if best_source[prefix] in stale:
+                    self._reselect(prefix, best[prefix], changes)
+
+        if source is LOCAL:
+            self._apply_local(updates, changes, forwarded)
+        else:
+            asn = self.as_number
+            slot = self.peer_slots[source]
+            adj = self.rib_in[slot]
+            loops = {}
+            for prefix, attr in updates.items():
+                if attr != NO_ROUTE:
+                    looped = loops.get(attr)
+                    if looped is None:
+                        looped = loops[attr] = attributes.on_path(attr, asn)
+                    if looped or (causes and prefix in causes and stale_for(attr, causes[prefix])):
+                        # Silmukan muodostava tai vanhentunut reitti korvaa lähteen aiemman reitin poistona
+                        attr = NO_ROUTE
+                if attr == NO_ROUTE:
+                    if adj[prefix] == NO_ROUTE:
+                        continue
+                adj[prefix] = attr
+
+                current = best[prefix]
+                if current == NO_ROUTE:
+                    if attr != NO_ROUTE:
+                        best[prefix] = attr
+                        best_source[prefix] = slot
+                        changes[prefix] = (NO_ROUTE, attr)
+                elif attr != NO_ROUTE and rank[attr] < rank[current]:
+                    best[prefix] = attr
+                    best_source[prefix] = slot
+                    changes[prefix] = (current, attr)
+                elif best_source[prefix] == slot:
+                    self._reselect(prefix, current, changes)
+        if self.fib is not None and changes:
+            self._update_fib(changes)
+        return changes, forwarded
+
+    def _apply_local(self, updates, changes, forwarded):
+        rank = self.attributes.rank
+        best, best_source, local = self.best, self.best_source, self.local
+        for prefix, attr in updates.items():
+            if attr == NO_ROUTE:
+                removed = local.pop(prefix, None)
+                if removed is None:
+                    continue
+                forwarded[prefix] = removed
+            else:
+                local[prefix] = attr
+            current = best[prefix]
+            if current == NO_ROUTE:
+                if attr != NO_ROUTE:
+                    best[prefix] = attr
+                    best_source[prefix] = -1
+                    changes[prefix] = (NO_ROUTE, attr)
+            elif attr != NO_ROUTE and rank[attr] < rank[current]:
+                best[prefix] = attr
+                best_source[prefix] = -1
+                changes[prefix] = (current, attr)
+            elif best_source[prefix] == -1:
+                self._reselect(prefix, current, changes)
+
+    def export(self, changes):
+        """Muuttuneet reitit naapureille: {naapuri: {etuliite: attribuutti tai NO_ROUTE}}.
+
+        Reittiä ei lähetetä takaisin naapurille, jolta se opittiin; jos sille oli ilmoitettu aiempi
+        reitti, se poistetaan. Muut silmukat vastaanottaja hylkää itse AS-polun perusteella.
+        """
+        attributes = self.attributes
+        parent, asns = attributes.parent, attributes.asn
+        asn = self.as_number
+        exported = {}
+        shared = {}
+        excluded = {}  # naapurin AS -> [(etuliite, vanha attribuutti)], kun reitti opittiin siltä
+        for prefix, (old, new) in changes.items():
+            if new == NO_ROUTE:
+                shared[prefix] = NO_ROUTE
+                if parent[old] != NO_ROUTE:
+                    excluded.setdefault(asns[old], []).append((prefix, NO_ROUTE))
+                continue
+            # Sama attribuutti on usein monen etuliitteen paras reitti, joten se viedään kerran
+            route = exported.get(new)
+            if route is None:
+                route = exported[new] = attributes.extend(new, asn)
+            shared[prefix] = route
+            if parent[new] != NO_ROUTE:
+                excluded.setdefault(asns[new], []).append((prefix, old))
+
+        outgoing = {}
+        for peer in self.peers:
+            peer_asn = peer.as_number
+            updates = dict(shared)
+            for prefix, old in excluded.get(peer_asn, ()):
+                if old != NO_ROUTE and (parent[old] == NO_ROUTE or asns[old] != peer_asn):
+                    updates[prefix] = NO_ROUTE
+                else:
+                    del updates[prefix]
+            outgoing[peer] = updates
+        return outgoing
+
+    def display_routing_table(self):
+        """Näytä reititystaulu."""
+        print(f"{self.operator_name} ({self.as_number}) Reititystaulu:")
+        for prefix, cost in self.routing_table.items():
+            print(f"  {prefix} => Etäisyys: {cost}")
+
+    def get_routing_data(self):
+        """Hae reititystiedot kaaviota varten."""
+        return [(self.operator_name, prefix, cost) for prefix, cost in self.routing_table.items()]
+
+# Tulosta reitittimien seuraavat hypyt osoitteelle pisimmän etuliitteen haulla
+def print_next_hops(routers, address):
+    print(f"\nEdelleenlähetys osoitteelle {address}:")
+    for router in routers:
+        next_hop = router.lookup(address)
+        if next_hop is None:
+            target = "ei reittiä"
+        elif next_hop is router:
+            target = "paikallinen"
+        else:
+            target = next_hop.operator_name
+        print(f"  {router.operator_name} => {target}")
+
+class BGPSimulator:
+    """Diskreetti tapahtumajono reitittimien välisille päivitysviesteille.
+
+    Jokainen viesti saapuu viiveen delay jälkeen. Jos samalta lähettäjältä samalle vastaanottajalle
+    on jo viesti jonossa, uudet muutokset yhdistetään siihen, joten välivaiheen reittejä ei
+    tarvitse käsitellä.
+    """
+
+    def __init__(self, routers, delay=1, verbose=False):
+        self.routers = routers
+        self.delay = delay
+        self.verbose = verbose
+        self.prefixes = PrefixTable()
+        self.attributes = AttributeTable()
+        for router in routers:
+            router.bind(self.prefixes, self.attributes)
+        self.time = 0
+        self.queue = []
+        # (lähettäjä, vastaanottaja) -> jonossa olevat (etuliitteet, attribuutit, syiden etuliitteet, syyt);
+        # myöhemmin lisätty arvo korvaa saman etuliitteen aiemman
+        self.pending = {}
+        self.sequence = 0
+        self.epoch = 0
+        self.messages = self.updates = self.changes = 0
+
+    def _send(self, sender, changes, causes):
+        self.changes += len(changes)
+        for peer, updates in sender.export(changes).items():
+            if not updates and not causes:
+                continue
+            pending = self.pending.get((sender, peer))
+            if pending is None:
+                pending = self.pending[(sender, peer)] = (array('i'), array('i'), array('i'), array('i'))
+                heapq.heappush(self.queue, (self.time + self.delay, self.sequence, sender, peer))
+                self.sequence += 1
+            pending[0].extend(updates.keys())
+            pending[1].extend(updates.values())
+            pending[2].extend(causes.keys())
+            pending[3].extend(causes.values())
+
+    def originate(self, router, routes):
+        """Lisää reitittimen omat reitit {etuliite: kustannus}."""
+        self.epoch += 1
+        attrs = {}
+        updates = {}
+        for prefix, cost in routes.items():
+            attr = attrs.get(cost)
+            if attr is None:
+                attr = attrs[cost] = self.attributes.local(router.as_number, cost, self.epoch)
+            updates[self.prefixes.intern(prefix)] = attr
+        changes, causes = router.apply(LOCAL, updates)
+        if changes or causes:
+            self._send(router, changes, causes)
+
+    def withdraw(self, router, prefixes):
+        """Poista reitittimen omat reitit."""
+        updates = {}
+        for prefix in prefixes:
+            i = self.prefixes.find(prefix)
+            if i is not None:
+                updates[i] = NO_ROUTE
+        changes, causes = router.apply(LOCAL, updates)
+        if changes or causes:
+            self._send(router, changes, causes)
+
+    def run(self, max_events=None):
+        """Käsittele tapahtumia, kunnes jono tyhjenee (tai max_events täyttyy)."""
+        processed = 0
+        # Taulukoihin tallennetut reitit eivät muodosta viittaussilmukoita, joten syklinen roskienkeruu
+        # kävisi viestien sanakirjoja läpi turhaan; se pysäytetään ajon ajaksi
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            while self.queue and (max_events is None or processed < max_events):
+                self.time, _, sender, receiver = heapq.heappop(self.queue)
+                prefixes, attrs, cause_prefixes, cause_attrs = self.pending.pop((sender, receiver))
+                updates = dict(zip(prefixes, attrs))
+                causes = dict(zip(cause_prefixes, cause_attrs))
+                self.messages += 1
+                self.updates += len(updates) + len(causes)
+                changes, causes = receiver.apply(sender, updates, causes)
+                if self.verbose:
+                    self._log(sender, receiver, changes)
+                if changes or causes:
+                    self._send(receiver, changes, causes)
+                processed += 1
+        finally:
+            if collecting:
+                gc.enable()
+        return SimulationStats(self.messages, self.updates, self.changes, self.time)
+
+    def _log(self, sender, receiver, changes):
+        print(f"{receiver.operator_name} vastaanotti reitityspäivityksen {sender.operator_name}:ltä")
+        for prefix, (_, new) in changes.items():
+            if new == NO_ROUTE:
+                print(f"{receiver.operator_name} poisti reitin {self.prefixes.name(prefix)}")
+            else:
+                print(f"{receiver.operator_name} päivitti reitin {self.prefixes.name(prefix)}: "
+                      f"etäisyys {self.attributes.cost(new)}")
+
+    @property
+    def converged(self):
+        return not self.queue
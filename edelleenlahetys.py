@@ -0,0 +1,275 @@
+# Edelleenlähetystaulu (FIB): pisimmän etuliitteen haku (longest-prefix match) IPv4- ja IPv6-osoitteille.
+#
+# Jokaista osoiteperhettä vastaa polkutiivistetty binäärinen trie (Patricia), jonka solmut ovat
+# rinnakkaisissa taulukoissa: verkko-osoite, etuliitteen pituus, lapset ja arvon indeksi. Lisäys ja
+# poisto ovat O(osoitteen bittimäärä), joten taulu päivittyy RIB:n muutosten mukana reitti kerrallaan.
+#
+# Erähakua varten trie käännetään tarvittaessa järjestetyksi välitaulukoksi: jokainen väli alkaa
+# osoitteesta starts[i] ja sen pisin osuva etuliite on slots[i]. Haku on tällöin binäärihaku
+# (numpy.searchsorted koko erälle kerralla). Käännös tehdään uudelleen vasta, kun taulu on
+# muuttunut edellisen eräkyselyn jälkeen.
+import bisect
+import ipaddress
+from array import array
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NO_ROUTE = -1
+# Muistettujen etuliitteiden enimmäismäärä: pitkissä simulaatioissa muisti ei kasva rajatta
+PREFIX_CACHE_SIZE = 4096
+
+# '10.0.0.0/24' -> (versio, verkko kokonaislukuna, pituus); viimeisimmät tulokset muistetaan, koska samat
+# etuliitteet toistuvat reitityspäivityksissä
+@lru_cache(maxsize=PREFIX_CACHE_SIZE)
+def parse_prefix(prefix):
+    network = ipaddress.ip_network(prefix, strict=False)
+    return network.version, int(network.network_address), network.prefixlen
+
+def parse_address(address):
+    address = ipaddress.ip_address(address)
+    return address.version, int(address)
+
+class PrefixTrie:
+    """Polkutiivistetty binäärinen trie yhdelle osoiteperheelle (width = 32 tai 128 bittiä)."""
+
+    def __init__(self, width):
+        self.width = width
+        # Solmu 0 on juuri (pituus 0); vapautetut solmut käytetään uudelleen
+        self.network = [0]
+        self.length = array('i', [0])
+        self.left = array('i', [-1])
+        self.right = array('i', [-1])
+        self.slot = array('i', [NO_ROUTE])
+        self.free = []
+        self.routes = 0
+        self._ranges = None
+
+    def _bit(self, address, position):
+        return (address >> (self.width - 1 - position)) & 1
+
+    def _new_node(self, network, length, slot):
+        if self.free:
+            node = self.free.pop()
+            self.network[node] = network
+            self.length[node] = length
+            self.left[node] = self.right[node] = -1
+            self.slot[node] = slot
+            return node
+        self.network.append(network)
+        self.length.append(length)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.slot.append(slot)
+        return len(self.length) - 1
+
+    def _children(self, bit):
+        return self.right if bit else self.left
+
+    def insert(self, network, length, slot):
+        """Lisää tai korvaa etuliitteen network/length arvo (slot >= 0)."""
+        self._ranges = None
+        width = self.width
+        if length < width:
+            network = network >> (width - length) << (width - length)
+        networks, lengths, left, right = self.network, self.length, self.left, self.right
+        node = 0
+        while True:
+            node_length = lengths[node]
+            if node_length == length:
+                if self.slot[node] == NO_ROUTE:
+                    self.routes += 1
+                self.slot[node] = slot
+                return
+            children = right if (network >> (width - 1 - node_length)) & 1 else left
+            child = children[node]
+            if child < 0:
+                children[node] = self._new_node(network, length, slot)
+                self.routes += 1
+                return
+            child_length = lengths[child]
+            limit = length if length < child_length else child_length
+            diff = (network ^ networks[child]) >> (width - limit)
+            if not diff and limit == child_length:
+                node = child
+                continue
+            common = limit - diff.bit_length()
+            if common == length:
+                # Uusi etuliite on lapsen yläpuolella
+                new = self._new_node(network, length, slot)
+                self._children(self._bit(networks[child], length))[new] = child
+            else:
+                # Haarautumiskohtaan tarvitaan arvoton välisolmu
+                split = network >> (width - common) << (width - common) if common else 0
+                new = self._new_node(split, common, NO_ROUTE)
+                leaf = self._new_node(network, length, slot)
+                self._children(self._bit(network, common))[new] = leaf
+                self._children(self._bit(networks[child], common))[new] = child
+            children[node] = new
+            self.routes += 1
+            return
+
+    def remove(self, network, length):
+        """Poista etuliite; palauttaa False, jos sitä ei ollut."""
+        width = self.width
+        if length < width:
+            network = network >> (width - length) << (width - length)
+        path = []
+        node = 0
+        while self.length[node] < length:
+            bit = self._bit(network, self.length[node])
+            child = self._children(bit)[node]
+            if child < 0 or self.length[child] > length or \
+                    (network ^ self.network[child]) >> (width - self.length[child]):
+                return False
+            path.append((node, bit))
+            node = child
+        if self.length[node] != length or self.slot[node] == NO_ROUTE:
+            return False
+        self._ranges = None
+        self.slot[node] = NO_ROUTE
+        self.routes -= 1
+
+        # Arvottomat solmut, joilla on alle kaksi lasta, tiivistetään pois
+        while node and self.slot[node] == NO_ROUTE:
+            left, right = self.left[node], self.right[node]
+            if left >= 0 and right >= 0:
+                break
+            parent, bit = path.pop()
+            self._children(bit)[parent] = left if left >= 0 else right
+            self.free.append(node)
+            self.network[node] = 0
+            node = parent
+        return True
+
+    def lookup(self, address):
+        """Pisimmän osuvan etuliitteen arvo tai NO_ROUTE."""
+        if self._ranges is not None:
+            starts, slots = self._ranges
+            return slots[bisect.bisect_right(starts, address) - 1]
+        width = self.width
+        network, length, left, right, slots = self.network, self.length, self.left, self.right, self.slot
+        node = 0
+        best = slots[0]
+        while True:
+            node_length = length[node]
+            if node_length == width:
+                return best
+            child = right[node] if (address >> (width - 1 - node_length)) & 1 else left[node]
+            if child < 0:
+                return best
+            child_length = length[child]
+            if (address ^ network[child]) >> (width - child_length):
+                return best
+            node = child
+            if slots[node] != NO_ROUTE:
+                best = slots[node]
+
+    def items(self):
+        """(verkko, pituus, arvo) kaikille etuliitteille osoitejärjestyksessä."""
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self.slot[node] != NO_ROUTE:
+                yield self.network[node], self.length[node], self.slot[node]
+            for child in (self.right[node], self.left[node]):
+                if child >= 0:
+                    stack.append(child)
+
+    def ranges(self):
+        """Käännetty välitaulukko (starts, slots); lasketaan uudelleen vain muutosten jälkeen."""
+        if self._ranges is not None:
+            return self._ranges
+        width = self.width
+        starts = []
+        slots = []
+
+        def emit(start, slot):
+            if starts and starts[-1] == start:
+                slots[-1] = slot
+            elif not slots or slots[-1] != slot:
+                starts.append(start)
+                slots.append(slot)
+            # Ohitetaan väli, jonka arvo on sama kuin edellisen: välit yhdistyvät
+
+        # Syvyyshaku: solmun oma väli alkaa verkko-osoitteesta, ja jokaisen lapsen jälkeen palataan
+        # solmun arvoon lapsen välin lopusta (ellei solmun väli pääty siihen)
+        stack = [(0, NO_ROUTE, False)]
+        while stack:
+            node, inherited, closing = stack.pop()
+            if closing:
+                end = self.network[node] + (1 << (width - self.length[node]))
+                if end < 1 << width:
+                    emit(end, inherited)
+                continue
+            slot = self.slot[node]
+            if slot == NO_ROUTE:
+                slot = inherited
+            emit(self.network[node], slot)
+            for child in (self.right[node], self.left[node]):
+                if child >= 0:
+                    stack.append((child, slot, True))
+                    stack.append((child, slot, False))
+        if width <= 64:
+            # Tiiviit taulukot, jotka numpy näkee ilman kopiointia
+            starts, slots = array('Q', starts), array('q', slots)
+        self._ranges = (starts, slots)
+        return self._ranges
+
+    def lookup_many(self, addresses):
+        """Erähaku: arvot (NO_ROUTE = ei reittiä) osoitteille samassa järjestyksessä."""
+        starts, slots = self.ranges()
+        if np is not None and self.width <= 64:
+            index = np.searchsorted(np.frombuffer(starts, dtype=np.uint64),
+                                    np.asarray(addresses, dtype=np.uint64), side='right') - 1
+            return np.frombuffer(slots, dtype=np.int64)[index]
+        position = bisect.bisect_right
+        return array('q', [slots[position(starts, address) - 1] for address in addresses])
+
+class ForwardingTable:
+    """Etuliitemerkkijonoista (IPv4 ja IPv6) seuraaviin hyppyihin; arvot tallennetaan kerran."""
+
+    def __init__(self):
+        self.tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+        self.values = []
+        self.value_index = {}
+
+    def _slot(self, value):
+        slot = self.value_index.get(value)
+        if slot is None:
+            slot = self.value_index[value] = len(self.values)
+            self.values.append(value)
+        return slot
+
+    # Etuliite merkkijonona tai valmiiksi jäsennettynä (versio, verkko, pituus)
+    def insert(self, prefix, value):
+        version, network, length = parse_prefix(prefix) if isinstance(prefix, str) else prefix
+        self.tries[version].insert(network, length, self._slot(value))
+
+    def remove(self, prefix):
+        version, network, length = parse_prefix(prefix) if isinstance(prefix, str) else prefix
+        return self.tries[version].remove(network, length)
+
+    def __len__(self):
+        return sum(trie.routes for trie in self.tries.values())
+
+    def lookup(self, address):
+        """Seuraava hyppy osoitteelle ('10.0.0.1' tai (versio, kokonaisluku)); None, jos reittiä ei ole."""
+        version, value = parse_address(address) if isinstance(address, str) else address
+        slot = self.tries[version].lookup(value)
+        return None if slot == NO_ROUTE else self.values[slot]
+
+    def lookup_many(self, addresses, version=4):
+        """Erähaku kokonaislukuosoitteille (lista, array tai numpy-taulukko) yhdestä osoiteperheestä."""
+        slots = self.tries[version].lookup_many(addresses)
+        # NO_ROUTE = -1 osoittaa listan viimeiseen alkioon None
+        values = self.values + [None]
+        if np is not None and isinstance(slots, np.ndarray):
+            table = np.empty(len(values), dtype=object)
+            for i, value in enumerate(values):
+                table[i] = value
+            return table[slots].tolist()
+        return [values[slot] for slot in slots]
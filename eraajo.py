@@ -0,0 +1,199 @@
+# Eräajo ilman input()-kyselyjä ja piirtämistä: topologia tiedostosta, algoritmi ja
+# lähde/kohde-kyselyt komentoriviltä tai tiedostosta, tulokset tiedostoihin.
+#
+# Esimerkkejä:
+#   python eraajo.py verkko.txt --algorithm ospf --queries kyselyt.txt --output reitit.tsv
+#   python eraajo.py verkko.txt --algorithm rip --query 0 3 --query 1 4 --tables rip_taulut.txt
+#   python eraajo.py verkko.txt --algorithm mst --tables puu.txt
+#   python eraajo.py verkko.txt --algorithm ch --queries kyselyt.txt --output reitit.tsv
+#
+# Kyselytiedostossa on rivi "<lähde> <kohde>" kyselyä kohden ('-' = vakiosyöte). Tulos on
+# sarkaineroteltu: lähde, kohde, etäisyys (inf, jos reittiä ei ole) ja reitti muodossa "0 -> 4 -> 2".
+# ch-tila laskee kerran supistushierarkian (tallennetaan välimuistiin) ja vastaa jokaiseen
+# kyselyyn erikseen; sopii suurille verkoille ja kyselymäärille, joille kaikkien parien taulut eivät mahdu muistiin.
+import argparse
+import contextlib
+import importlib
+import io
+import sys
+import time
+from collections import deque
+
+from supistus import cached_hierarchy, ch_shortest_path
+from valimuisti import cached_network_arrays
+from verkkolukija import print_rejected, read_network_arrays
+
+ALGORITHMS = ('ospf', 'rip', 'mst', 'ch')
+
+def read_queries(path, num_nodes):
+    queries = []
+    rejected = []
+    f = sys.stdin if path == '-' else open(path)
+    with f:
+        for line_no, line in enumerate(f, 1):
+            parts = line.split()
+            if not parts:
+                continue
+            try:
+                src, dst = int(parts[0]), int(parts[1])
+            except (ValueError, IndexError):
+                rejected.append((line_no, line.strip(), "virheellinen kysely"))
+                continue
+            if len(parts) != 2 or not (0 <= src < num_nodes and 0 <= dst < num_nodes):
+                rejected.append((line_no, line.strip(), "virheellinen kysely"))
+                continue
+            queries.append((src, dst))
+    return queries, rejected
+
+def _path_from_prev(prev, src, dst):
+    path = [dst]
+    while dst != src:
+        dst = prev[dst]
+        path.append(dst)
+    return path[::-1]
+
+# Jokainen vastaaja palauttaa listan (etäisyys, polku) kyselyjen järjestyksessä; saavuttamattomalle
+# kohteelle (inf, []). Saman lähteen kyselyt lasketaan yhdellä ajolla.
+
+def answer_ospf(num_nodes, links, queries, tables_path=None, workers=1, cache=True):
+    ospf = importlib.import_module('1')
+    csr = ospf.csr_from_links(num_nodes, links)
+    sources = sorted({src for src, _ in queries})
+    by_source = {}
+    for src, (dist, prev) in zip(sources, ospf.dijkstra_rows(csr, workers, [csr.index[s] for s in sources])):
+        by_source[src] = dist, prev
+
+    answers = []
+    for src, dst in queries:
+        dist, prev = by_source[src]
+        i, j = csr.index[src], csr.index[dst]
+        if dist[j] == float('inf'):
+            answers.append((float('inf'), []))
+        else:
+            answers.append((dist[j], [csr.nodes[k] for k in _path_from_prev(prev, i, j)]))
+
+    if tables_path:
+        # Yhteenvetorivi stderriin, jotta se ei sekoitu vakiotulosteen vastauksiin
+        with contextlib.redirect_stdout(sys.stderr):
+            ospf.print_and_save_routing_tables(csr, tables_path, use_csr=True, workers=workers, cache=cache,
+                                               echo=False)
+    return answers
+
+def answer_rip(num_nodes, links, queries, tables_path=None, workers=1, cache=True):
+    rip = importlib.import_module('2')
+    with contextlib.redirect_stdout(io.StringIO()):
+        cost, next_hop = rip.cached_rip(num_nodes, links, cache)
+
+    answers = []
+    for src, dst in queries:
+        distance = float(cost[src * num_nodes + dst])
+        if distance == float('inf'):
+            answers.append((distance, []))
+            continue
+        # Kuljetaan seuraavat hypyt; pituusraja estää ikuisen silmukan virheellisissä tauluissa
+        path = [src]
+        while path[-1] != dst and len(path) <= num_nodes:
+            path.append(int(next_hop[path[-1] * num_nodes + dst]))
+        if distance.is_integer():
+            distance = int(distance)
+        answers.append((distance, path) if path[-1] == dst else (float('inf'), []))
+
+    if tables_path:
+        rip.save_to_file(rip.iter_tables_from_arrays(num_nodes, cost, next_hop), tables_path)
+    return answers
+
+def answer_mst(num_nodes, links, queries, tables_path=None, workers=1, cache=True):
+    mst = importlib.import_module('9').kruskal(list(range(num_nodes)), list(links))
+    tree = [[] for _ in range(num_nodes)]
+    for u, v, w in mst:
+        tree[u].append((v, w))
+        tree[v].append((u, w))
+
+    by_source = {}
+    for src in {src for src, _ in queries}:
+        dist = {src: 0}
+        prev = {}
+        queue = deque([src])
+        while queue:
+            u = queue.popleft()
+            for v, w in tree[u]:
+                if v not in dist:
+                    dist[v] = dist[u] + w
+                    prev[v] = u
+                    queue.append(v)
+        by_source[src] = dist, prev
+
+    answers = []
+    for src, dst in queries:
+        dist, prev = by_source[src]
+        if dst not in dist:
+            answers.append((float('inf'), []))
+        else:
+            answers.append((dist[dst], _path_from_prev(prev, src, dst)))
+
+    if tables_path:
+        # Puu tallennetaan samassa muodossa kuin verkko.txt, jotta sitä voi käyttää syötteenä
+        with open(tables_path, 'w') as f:
+            f.write(f"{num_nodes} {len(mst)}\n")
+            f.writelines(f"{u} {v} {w}\n" for u, v, w in mst)
+    return answers
+
+def answer_ch(num_nodes, links, queries, tables_path=None, workers=1, cache=True):
+    ch = cached_hierarchy(num_nodes, links, cache)
+    return [ch_shortest_path(ch, src, dst) for src, dst in queries]
+
+ANSWERS = {'ospf': answer_ospf, 'rip': answer_rip, 'mst': answer_mst, 'ch': answer_ch}
+
+def write_answers(out, queries, answers):
+    out.write("lähde\tkohde\tetäisyys\treitti\n")
+    out.writelines(
+        f"{src}\t{dst}\t{cost}\t{' -> '.join(map(str, path))}\n"
+        for (src, dst), (cost, path) in zip(queries, answers)
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reitityksen eräajo ilman interaktiivisia kyselyjä ja piirtämistä")
+    parser.add_argument('topology', help="verkko.txt-muotoinen topologiatiedosto")
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='ospf')
+    parser.add_argument('--queries', help="kyselytiedosto (rivit '<lähde> <kohde>', '-' = vakiosyöte)")
+    parser.add_argument('--query', nargs=2, type=int, action='append', default=[], metavar=('LÄHDE', 'KOHDE'))
+    parser.add_argument('--output', help="kyselyjen tulokset (oletus: vakiotuloste)")
+    parser.add_argument('--tables', help="koko reititystaulujen (mst: virittävän puun) tallennuspolku")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--no-cache', action='store_true', help="älä käytä binääristä välimuistia")
+    args = parser.parse_args(argv)
+    if args.algorithm == 'ch' and args.tables:
+        parser.error("--tables ei ole käytettävissä ch-tilassa")
+
+    start = time.perf_counter()
+    if args.no_cache:
+        num_nodes, us, vs, costs, rejected = read_network_arrays(args.topology)
+    else:
+        num_nodes, us, vs, costs, rejected = cached_network_arrays(args.topology)
+    links = list(zip(us, vs, costs))
+    with contextlib.redirect_stdout(sys.stderr):
+        print_rejected(rejected)
+
+    for q in args.query:
+        if not all(0 <= x < num_nodes for x in q):
+            parser.error(f"reititin alueen ulkopuolella: {q[0]} {q[1]}")
+    queries = [tuple(q) for q in args.query]
+    if args.queries:
+        file_queries, bad_queries = read_queries(args.queries, num_nodes)
+        queries.extend(file_queries)
+        with contextlib.redirect_stdout(sys.stderr):
+            print_rejected(bad_queries)
+
+    answers = ANSWERS[args.algorithm](num_nodes, links, queries, args.tables, args.workers, not args.no_cache)
+    if args.output:
+        with open(args.output, 'w', buffering=1 << 20) as out:
+            write_answers(out, queries, answers)
+    elif queries:
+        write_answers(sys.stdout, queries, answers)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {args.algorithm}: {num_nodes} reititintä, {len(links)} linkkiä, {len(queries)} kyselyä, {elapsed:.2f} s",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
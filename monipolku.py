@@ -0,0 +1,103 @@
+# Monipolkureititys (ECMP): kaikki yhtä lyhyet seuraavat hypyt ja polut yhden lähteen Dijkstralla.
+#
+# Verkko annetaan naapurilistoina adjacency[v] = [(naapuri, paino), ...], solmut 0..n-1, painot > 0.
+# Lähteen seuraavat hypyt tallennetaan bittijoukkona: bitti i tarkoittaa lähteen i:ttä naapuria
+# adjacency[src]-listassa. Solmun joukko on sen yhtä hyvien edeltäjien joukkojen yhdiste ja polkujen
+# määrä niiden polkumäärien summa, joten molemmat saadaan Dijkstran aikana ilman polkulistoja.
+# Polut luetellaan tarvittaessa edeltäjäverkosta generaattorina, yksi kerrallaan.
+import heapq
+from array import array
+
+def csr_adjacency(offsets, targets, weights):
+    return [list(zip(targets[offsets[v]:offsets[v + 1]], weights[offsets[v]:offsets[v + 1]]))
+            for v in range(len(offsets) - 1)]
+
+def graph_adjacency(G, num_nodes):
+    return [[(u, attrs['weight']) for u, attrs in G[v].items()] if v in G else [] for v in range(num_nodes)]
+
+# Palauttaa (dist, hops, counts, preds): etäisyydet, seuraavien hyppyjen bittijoukot, yhtä lyhyiden
+# polkujen määrät ja (keep_preds=True) jokaisen solmun yhtä hyvät edeltäjät, muuten None
+def ecmp_dijkstra(adjacency, src, keep_preds=False):
+    num_nodes = len(adjacency)
+    inf = float('inf')
+    dist = [inf] * num_nodes
+    hops = [0] * num_nodes
+    counts = [0] * num_nodes
+    preds = [()] * num_nodes if keep_preds else None
+    dist[src] = 0
+    counts[src] = 1
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    queue = []
+    for i, (v, w) in enumerate(adjacency[src]):
+        if w < dist[v]:
+            dist[v] = w
+            hops[v] = 1 << i
+            counts[v] = 1
+            if keep_preds:
+                preds[v] = [src]
+            heappush(queue, (w, v))
+        elif w == dist[v]:
+            hops[v] |= 1 << i
+            counts[v] += 1
+            if keep_preds:
+                preds[v].append(src)
+
+    # Positiivisilla painoilla kaikki solmun u yhtä hyvät edeltäjät on käsitelty ennen u:ta,
+    # joten u:n joukko ja polkumäärä ovat lopullisia, kun se otetaan jonosta
+    while queue:
+        d, u = heappop(queue)
+        if d > dist[u]:
+            continue
+        hop_u, count_u = hops[u], counts[u]
+        for v, w in adjacency[u]:
+            alt = d + w
+            if alt < dist[v]:
+                dist[v] = alt
+                hops[v] = hop_u
+                counts[v] = count_u
+                if keep_preds:
+                    preds[v] = [u]
+                heappush(queue, (alt, v))
+            elif alt == dist[v]:
+                hops[v] |= hop_u
+                counts[v] += count_u
+                if keep_preds:
+                    preds[v].append(u)
+    return dist, hops, counts, preds
+
+# Bittijoukot tiiviiksi taulukoksi, kun lähteellä on enintään 64 naapuria (muuten lista kokonaislukuja)
+def compact_hops(hops, degree):
+    return array('Q', hops) if degree <= 64 else hops
+
+# Bittijoukko seuraavien hyppyjen solmunumeroiksi; neighbors = lähteen naapurit adjacency-järjestyksessä
+def hop_list(neighbors, mask):
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(neighbors[low.bit_length() - 1])
+        mask ^= low
+    return result
+
+# Kaikki yhtä lyhyet polut src -> dst edeltäjäverkosta; polut tuotetaan yksi kerrallaan,
+# joten niitä ei tarvitse mahduttaa muistiin yhtä aikaa (määrä: counts[dst])
+def equal_cost_paths(preds, src, dst):
+    if dst == src:
+        yield [src]
+        return
+    if not preds[dst]:
+        return
+    path = [dst]
+    stack = [iter(preds[dst])]
+    while stack:
+        p = next(stack[-1], None)
+        if p is None:
+            stack.pop()
+            path.pop()
+            continue
+        path.append(p)
+        if p == src:
+            yield path[::-1]
+            path.pop()
+        else:
+            stack.append(iter(preds[p]))
@@ -0,0 +1,180 @@
+# IP-osoitteiden eräjäsennys ja luokittelu ARP- ja naapuritauluille (IPv4 ja IPv6).
+#
+# Tiedosto luetaan lohkoittain, ja jokaisen rivin ensimmäinen osoite poimitaan yhdellä säännöllisellä
+# lausekkeella koko lohkosta. Osoitteet muunnetaan binäärimuotoon inet_pton-kutsuilla, jotka
+# ketjutetaan yhdeksi tavujonoksi ja luetaan kerralla tiiviiksi taulukoiksi:
+# IPv4 array('I') ja IPv6 kahtena array('Q')-taulukkona (ylä- ja alapuolisko).
+#
+# Luokittelu (unicast, multicast, broadcast, varattu) tehdään taulukkomaskeilla koko taulukolle kerralla.
+import re
+import socket
+import sys
+from array import array
+from functools import partial
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNK_BYTES = 1 << 23
+
+UNICAST, MULTICAST, BROADCAST, RESERVED = range(4)
+CATEGORY_NAMES = ('unicast', 'multicast', 'broadcast', 'varattu')
+
+# Rivin alun ensimmäinen osoite, mahdollinen vyöhyke (fe80::1%eth0) ohitetaan. Yksi osuma jokaista
+# riviä kohden (tyhjä, jos rivi ei ala osoitteella); kelpaa esim. /proc/net/arp-, "arp -an"-,
+# "ip neigh"- ja "ip -6 neigh" -tulosteille.
+ADDRESS_LINE = re.compile(r'(?m)^[^\w\n:]*(?:([0-9A-Fa-f:.]*[:.][0-9A-Fa-f:.]*)(?:%[\w.-]+)?(?![\w:.%]))?.*$')
+
+_pack_ipv4 = partial(socket.inet_pton, socket.AF_INET)
+_pack_ipv6 = partial(socket.inet_pton, socket.AF_INET6)
+
+def _from_network_order(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'little':
+        values.byteswap()
+    return values
+
+# Muuntaa osoitteet kerralla; jos jokin osoite on virheellinen, muunnetaan yksitellen.
+# Palauttaa virheellisten osoitteiden indeksit.
+def _pack(pack, tokens, out):
+    try:
+        out.append(b''.join(map(pack, tokens)))
+        return []
+    except OSError:
+        pass
+    bad = []
+    for i, token in enumerate(tokens):
+        try:
+            out.append(pack(token))
+        except OSError:
+            bad.append(i)
+    return bad
+
+# Yhden lohkon osoitteet; palauttaa [(rivin indeksi lohkossa, syy)] hylätyille riveille
+def _parse_block(text, ipv4_bytes, ipv6_bytes):
+    found = ADDRESS_LINE.findall(text)[:text.count('\n')]
+    problems = []
+    # Osoitteettomat rivit haetaan index-kutsuilla, koska niitä on yleensä vain muutama (otsikot)
+    i = -1
+    for _ in range(found.count('')):
+        i = found.index('', i + 1)
+        problems.append((i, "ei IP-osoitetta"))
+
+    if ':' not in ''.join(found):
+        tokens = list(filter(None, found))
+        rows = None
+        bad4 = _pack(_pack_ipv4, tokens, ipv4_bytes)
+        bad6 = []
+        tokens6 = ()
+    else:
+        rows = [i for i, token in enumerate(found) if token and ':' not in token]
+        rows6 = [i for i, token in enumerate(found) if ':' in token]
+        tokens = [found[i] for i in rows]
+        tokens6 = [found[i] for i in rows6]
+        bad4 = _pack(_pack_ipv4, tokens, ipv4_bytes)
+        bad6 = _pack(_pack_ipv6, tokens6, ipv6_bytes)
+
+    if bad4 or bad6:
+        if rows is None:
+            rows = [i for i, token in enumerate(found) if token]
+        problems.extend((rows[i], "virheellinen osoite") for i in bad4)
+        problems.extend((rows6[i], "virheellinen osoite") for i in bad6)
+    problems.sort()
+    return problems
+
+# Lukee osoitteet tiedostosta ('-' = vakiosyöte).
+# Palauttaa (ipv4 array('I'), ipv6_high array('Q'), ipv6_low array('Q'), hylätyt rivit [(rivinumero, rivi, syy)]).
+def read_addresses(filename):
+    ipv4_bytes = []
+    ipv6_bytes = []
+    rejected = []
+    line_no = 0
+    carry = ''
+    f = sys.stdin if filename == '-' else open(filename, encoding='latin-1', newline='')
+    with f:
+        while True:
+            block = f.read(CHUNK_BYTES)
+            text = carry + block
+            if block:
+                cut = text.rfind('\n') + 1
+                text, carry = text[:cut], text[cut:]
+            elif text and not text.endswith('\n'):
+                text += '\n'
+            problems = _parse_block(text, ipv4_bytes, ipv6_bytes)
+            if problems:
+                lines = text.split('\n')
+                for i, reason in problems:
+                    line = lines[i].strip()
+                    if line:
+                        rejected.append((line_no + i + 1, line, reason))
+            line_no += text.count('\n')
+            if not block:
+                break
+
+    ipv4 = _from_network_order('I', b''.join(ipv4_bytes))
+    ipv6 = _from_network_order('Q', b''.join(ipv6_bytes))
+    return ipv4, ipv6[0::2], ipv6[1::2], rejected
+
+# Osoitemerkkijonot muistista (esim. raw_ip_list); palauttaa saman muodon kuin read_addresses
+def parse_addresses(addresses):
+    text = '\n'.join(addresses) + '\n' if addresses else ''
+    ipv4_bytes = []
+    ipv6_bytes = []
+    problems = _parse_block(text, ipv4_bytes, ipv6_bytes)
+    rejected = [(i + 1, addresses[i], reason) for i, reason in problems]
+    ipv4 = _from_network_order('I', b''.join(ipv4_bytes))
+    ipv6 = _from_network_order('Q', b''.join(ipv6_bytes))
+    return ipv4, ipv6[0::2], ipv6[1::2], rejected
+
+def _as_uint(values, dtype):
+    if isinstance(values, array):
+        return np.frombuffer(values, dtype=dtype)
+    return np.asarray(values, dtype=dtype)
+
+# IPv4-osoitteiden luokat (UNICAST, MULTICAST, BROADCAST, RESERVED): multicast 224.0.0.0/4,
+# rajoitettu broadcast 255.255.255.255 ja varatut 0.0.0.0/8, 127.0.0.0/8 ja 240.0.0.0/4
+def classify_ipv4(values):
+    if np is None:
+        return array('B', (_classify_ipv4_one(x) for x in values))
+    values = _as_uint(values, np.uint32)
+    first = values >> 24
+    categories = np.zeros(len(values), dtype=np.uint8)
+    categories[(first == 0) | (first == 127) | (first >= 240)] = RESERVED
+    categories[(first >= 224) & (first < 240)] = MULTICAST
+    categories[values == 0xFFFFFFFF] = BROADCAST
+    return categories
+
+def _classify_ipv4_one(value):
+    first = value >> 24
+    if value == 0xFFFFFFFF:
+        return BROADCAST
+    if 224 <= first < 240:
+        return MULTICAST
+    if first == 0 or first == 127 or first >= 240:
+        return RESERVED
+    return UNICAST
+
+# IPv6-osoitteiden luokat: multicast ff00::/8 ja varattu ::/8 (mm. määrittelemätön ja loopback);
+# IPv6:ssa ei ole broadcastia
+def classify_ipv6(high, low):
+    if np is None:
+        return array('B', (MULTICAST if h >> 56 == 0xFF else RESERVED if h >> 56 == 0 else UNICAST
+                           for h in high))
+    top = _as_uint(high, np.uint64) >> np.uint64(56)
+    categories = np.zeros(len(top), dtype=np.uint8)
+    categories[top == 0] = RESERVED
+    categories[top == 0xFF] = MULTICAST
+    return categories
+
+# Luokkien lukumäärät {luokan nimi: määrä}
+def category_counts(categories):
+    if np is not None:
+        counts = np.bincount(np.asarray(categories, dtype=np.uint8), minlength=len(CATEGORY_NAMES)).tolist()
+    else:
+        counts = [0] * len(CATEGORY_NAMES)
+        for category in categories:
+            counts[category] += 1
+    return dict(zip(CATEGORY_NAMES, counts))
@@ -0,0 +1,177 @@
+# Pistekyselyt: lyhin reitti yhdelle lähde–kohde-parille ilman kaikkien parien laskentaa.
+# Verkko annetaan networkx-tyylisenä rakenteena (G[u] = {naapuri: {'weight': paino}}), solmut 0..n-1.
+#
+# bidirectional_dijkstra etenee lähteestä ja kohteesta yhtä aikaa ja pysähtyy, kun jonojen
+# pienimpien avainten summa ei voi enää parantaa löydettyä reittiä. Maamerkkien (ALT) kanssa
+# haku on kaksisuuntainen A*: kolmioepäyhtälön mukaan |d(L, v) - d(L, t)| <= d(v, t) jokaiselle
+# maamerkille L. Maamerkkien etäisyydet lasketaan kerran (select_landmarks / cached_landmarks)
+# ja ovat voimassa, kunnes verkko muuttuu.
+#
+# Kaikkien parien tilassa (6.py ja 7.py) lähteen reititystaulu on kompakti edeltäjätaulukko
+# (predecessor_array), josta polku kootaan reconstruct_path-funktiolla.
+import heapq
+from array import array
+
+from valimuisti import cache_path, load_arrays, save_arrays
+
+LANDMARKS = 8
+
+# Kompakti reititystaulu: lähteelle vain int32-taulukko edeltäjistä (-1 = ei edeltäjää).
+# dijkstra_predecessor_and_distance listaa ensimmäisenä saman edeltäjän, jota single_source_dijkstra käyttää polussa.
+def predecessor_array(G, src):
+    return predecessor_and_distance_arrays(G, src)[0]
+
+def predecessor_and_distance_arrays(G, src):
+    import networkx as nx
+
+    num_nodes = G.number_of_nodes()
+    prev = array('i', [-1]) * num_nodes
+    dist = array('d', [float('inf')]) * num_nodes
+    pred, lengths = nx.dijkstra_predecessor_and_distance(G, src)
+    for v, preds in pred.items():
+        if preds:
+            prev[v] = preds[0]
+        dist[v] = lengths[v]
+    return prev, dist
+
+# Kootaan polku edeltäjätaulukosta kohteesta taaksepäin (kuten 1.py:n reconstruct_path)
+def reconstruct_path(prev, start, end):
+    if not 0 <= end < len(prev) or (end != start and prev[end] < 0):
+        return []
+    path = [end]
+    while end != start:
+        end = prev[end]
+        path.append(end)
+    return path[::-1]
+
+def _walk(prev, node):
+    path = []
+    while node is not None:
+        path.append(node)
+        node = prev[node]
+    return path
+
+# Palauttaa (etäisyys, polku) tai (inf, []), jos kohdetta ei saavuteta. Maamerkkien kanssa
+# kumpikin suunta käyttää keskiarvopotentiaalia p(v) = (h_kohde(v) - h_lähde(v)) / 2, jolloin
+# eteenpäin avain on d(v) + p(v), taaksepäin d(v) - p(v) ja lopetusehto pysyy samana.
+def bidirectional_dijkstra(G, start, end, landmarks=None):
+    inf = float('inf')
+    if start == end:
+        return 0, [start]
+    if landmarks:
+        source_dists = [dist[start] for dist in landmarks]
+        target_dists = [dist[end] for dist in landmarks]
+        potentials = {}
+
+        def potential(v):
+            p = potentials.get(v)
+            if p is None:
+                to_end = _lower_bound(landmarks, target_dists, v)
+                from_start = _lower_bound(landmarks, source_dists, v)
+                # Solmu, josta ei pääse kohteeseen tai johon ei pääse lähteestä, ei voi olla reitillä
+                p = inf if to_end == inf or from_start == inf else (to_end - from_start) / 2
+                potentials[v] = p
+            return p
+
+        if potential(start) == inf:
+            return inf, []
+    else:
+        def potential(v):
+            return 0
+
+    heappop, heappush = heapq.heappop, heapq.heappush
+    dist = ({start: 0}, {end: 0})
+    prev = ({start: None}, {end: None})
+    queues = ([(potential(start), 0, start)], [(-potential(end), 0, end)])
+    best, meet = inf, None
+
+    while queues[0] and queues[1]:
+        if queues[0][0][0] + queues[1][0][0] >= best:
+            break
+        # Laajennetaan pienempää hakurintamaa
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        sign = 1 if side == 0 else -1
+        own, other = dist[side], dist[1 - side]
+        _, d, u = heappop(queues[side])
+        if d > own[u]:
+            continue
+        for v, attrs in G[u].items():
+            alt = d + attrs['weight']
+            if alt < own.get(v, inf):
+                p = potential(v)
+                if p == inf:
+                    continue
+                own[v] = alt
+                prev[side][v] = u
+                heappush(queues[side], (alt + sign * p, alt, v))
+                if v in other and alt + other[v] < best:
+                    best, meet = alt + other[v], v
+
+    if meet is None:
+        return inf, []
+    return best, _walk(prev[0], meet)[::-1] + _walk(prev[1], prev[1][meet])
+
+# Yhden lähteen etäisyydet taulukkona (inf = ei saavutettavissa)
+def _distances(G, src, num_nodes):
+    dist = array('d', [float('inf')]) * num_nodes
+    dist[src] = 0
+    queue = [(0, src)]
+    while queue:
+        d, u = heapq.heappop(queue)
+        if d > dist[u]:
+            continue
+        for v, attrs in G[u].items():
+            alt = d + attrs['weight']
+            if alt < dist[v]:
+                dist[v] = alt
+                heapq.heappush(queue, (alt, v))
+    return dist
+
+# Maamerkit valitaan kaukaisimman pisteen periaatteella: seuraava maamerkki on solmu, joka on
+# kauimpana jo valituista (ensin muista komponenteista, koska niiden etäisyys on inf)
+def select_landmarks(G, count=LANDMARKS):
+    num_nodes = G.number_of_nodes()
+    if num_nodes == 0:
+        return []
+    nearest = _distances(G, 0, num_nodes)
+    landmarks = []
+    for _ in range(min(count, num_nodes)):
+        candidate = max(range(num_nodes), key=nearest.__getitem__)
+        if nearest[candidate] == 0:
+            break
+        dist = _distances(G, candidate, num_nodes)
+        landmarks.append(dist)
+        for v in range(num_nodes):
+            if dist[v] < nearest[v]:
+                nearest[v] = dist[v]
+    return landmarks
+
+# Maamerkkien etäisyydet välimuistin kautta (cache_key = topologian tiiviste)
+def cached_landmarks(G, cache_key, count=LANDMARKS):
+    num_nodes = G.number_of_nodes()
+    path = cache_path(cache_key, 'maamerkit')
+    cached = load_arrays(path)
+    if cached is not None:
+        dist = cached[1]['dist']
+        return [dist[i:i + num_nodes] for i in range(0, len(dist), num_nodes)]
+    landmarks = select_landmarks(G, count)
+    flat = array('d')
+    for dist in landmarks:
+        flat.extend(dist)
+    save_arrays(path, num_nodes, dist=flat)
+    return landmarks
+
+def _lower_bound(landmarks, target_dists, v):
+    inf = float('inf')
+    bound = 0
+    for dist, dt in zip(landmarks, target_dists):
+        dv = dist[v]
+        if dv == inf or dt == inf:
+            # Eri komponenteissa kuin maamerkki: jos vain toinen on, kohdetta ei saavuteta
+            if dv != dt:
+                return inf
+            continue
+        b = dv - dt if dv > dt else dt - dv
+        if b > bound:
+            bound = b
+    return bound
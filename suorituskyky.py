@@ -0,0 +1,310 @@
+# Suorituskykymittaukset reititysalgoritmeille synteettisillä topologioilla.
+# Tulokset tulostetaan JSON-muodossa, jotta eri versioiden ajoja voidaan verrata keskenään.
+#
+# Esimerkki:
+#   python suorituskyky.py --sizes 100 500 --topologies random grid --output tulokset.json
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import networkx as nx
+
+# Topologiageneraattorit: palauttavat (solmujen määrä, [(u, v, paino), ...]); sama siemen tuottaa aina saman verkon
+
+def random_topology(num_nodes, rng, avg_degree=4):
+    links = {}
+    # Satunnainen virittävä puu takaa yhtenäisyyden
+    order = list(range(num_nodes))
+    rng.shuffle(order)
+    for i in range(1, num_nodes):
+        u, v = order[i], order[rng.randrange(i)]
+        links[(min(u, v), max(u, v))] = rng.randint(1, 20)
+    target = min(max(num_nodes - 1, num_nodes * avg_degree // 2), num_nodes * (num_nodes - 1) // 2)
+    while len(links) < target and num_nodes > 1:
+        u, v = rng.randrange(num_nodes), rng.randrange(num_nodes)
+        if u != v:
+            links.setdefault((min(u, v), max(u, v)), rng.randint(1, 20))
+    return num_nodes, [(u, v, w) for (u, v), w in links.items()]
+
+def grid_topology(num_nodes, rng):
+    side = max(1, math.isqrt(num_nodes))
+    num_nodes = side * side
+    links = []
+    for r in range(side):
+        for c in range(side):
+            node = r * side + c
+            if c + 1 < side:
+                links.append((node, node + 1, rng.randint(1, 20)))
+            if r + 1 < side:
+                links.append((node, node + side, rng.randint(1, 20)))
+    return num_nodes, links
+
+# Barabási–Albert: uusi solmu liittyy m:ään olemassa olevaan solmuun asteiden suhteessa
+def scale_free_topology(num_nodes, rng, m=2):
+    links = {}
+    targets = list(range(min(m, num_nodes)))
+    repeated = []
+    for node in range(len(targets), num_nodes):
+        for t in set(targets):
+            links[(t, node)] = rng.randint(1, 20)
+        repeated.extend(targets)
+        repeated.extend([node] * len(targets))
+        targets = [rng.choice(repeated) for _ in range(m)]
+    return num_nodes, [(u, v, w) for (u, v), w in links.items()]
+
+# Kolmitasoinen operaattoriverkko: täysin kytketty runko, jakelukerros kahteen runkoreitittimeen
+# ja pääsykerros kahteen jakelureitittimeen. Rungon linkit ovat halvimpia.
+def isp_topology(num_nodes, rng):
+    num_core = min(num_nodes, max(2, round(num_nodes ** 0.25)))
+    num_agg = max(0, min(num_nodes - num_core, round(num_nodes ** 0.5)))
+    core = range(num_core)
+    agg = range(num_core, num_core + num_agg)
+    access = range(num_core + num_agg, num_nodes)
+    links = {}
+    for i in core:
+        for j in core:
+            if i < j:
+                links[(i, j)] = rng.randint(1, 5)
+    for a in agg:
+        for c in rng.sample(core, min(2, num_core)):
+            links[(c, a)] = rng.randint(5, 20)
+    parents = agg if num_agg else core
+    for x in access:
+        for p in rng.sample(parents, min(2, len(parents))):
+            links[(p, x)] = rng.randint(10, 100)
+    return num_nodes, [(u, v, w) for (u, v), w in links.items()]
+
+TOPOLOGIES = {
+    'random': random_topology,
+    'grid': grid_topology,
+    'scale-free': scale_free_topology,
+    'isp': isp_topology,
+}
+
+def _module(name):
+    return importlib.import_module(name)
+
+def _graph(num_nodes, links):
+    G = nx.Graph()
+    G.add_nodes_from(range(num_nodes))
+    for u, v, w in links:
+        G.add_edge(u, v, weight=w)
+    return G
+
+# Jokainen mitattava algoritmi: valmistelu (ei mitata) palauttaa argumentittoman funktion, joka mitataan
+
+def prepare_dijkstra(num_nodes, links):
+    dijkstra = _module('1').dijkstra
+    G = _graph(num_nodes, links)
+    return lambda: [dijkstra(G, src) for src in G.nodes()]
+
+# CSR-Dijkstra kaikista lähteistä: jono valitaan painojen mukaan (Dialin kauhajono tai keko)
+def prepare_dijkstra_csr(num_nodes, links):
+    ospf = _module('1')
+    csr = ospf.csr_from_links(num_nodes, links)
+    return lambda: list(ospf.dijkstra_rows(csr))
+
+# Vertailukohta: sama CSR-Dijkstra aina kekojonolla
+def prepare_dijkstra_heap(num_nodes, links):
+    ospf = _module('1')
+    csr = ospf.csr_from_links(num_nodes, links)
+    return lambda: [ospf.dijkstra_csr(csr, source, False) for source in range(num_nodes)]
+
+def prepare_rip(num_nodes, links):
+    rip_simulation = _module('2').rip_simulation
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return rip_simulation(num_nodes, links)
+    return run
+
+def prepare_build_routing_table(num_nodes, links):
+    build_routing_table = _module('3').build_routing_table
+    G = _graph(num_nodes, links)
+    nodes = list(range(num_nodes))
+    return lambda: build_routing_table(G, nodes)
+
+def prepare_build_graph_and_paths(num_nodes, links):
+    build_graph_and_paths = _module('6').build_graph_and_paths
+    return lambda: build_graph_and_paths(num_nodes, links)
+
+def prepare_kruskal(num_nodes, links):
+    kruskal = _module('9').kruskal
+    nodes = list(range(num_nodes))
+    return lambda: kruskal(nodes, list(links))
+
+# Jokainen AS ilmoittaa omat etuliitteensä; mitataan konvergenssi koko reititystauluun asti
+def prepare_bgp(num_nodes, links, prefixes_per_as=4):
+    bgp = _module('bgpsimulaatio')
+    def run():
+        routers = [bgp.BGPRouter(f"AS{v}", 64512 + v) for v in range(num_nodes)]
+        for u, v, _ in links:
+            routers[u].add_peer(routers[v])
+            routers[v].add_peer(routers[u])
+        simulator = bgp.BGPSimulator(routers)
+        for v, router in enumerate(routers):
+            first = v * prefixes_per_as
+            simulator.originate(router, {f"10.{p >> 16 & 255}.{p >> 8 & 255}.{p & 255}/32": 1
+                                         for p in range(first, first + prefixes_per_as)})
+        return simulator.run()
+    return run
+
+ALGORITHMS = {
+    'dijkstra': prepare_dijkstra,
+    'dijkstra_csr': prepare_dijkstra_csr,
+    'dijkstra_heap': prepare_dijkstra_heap,
+    'rip': prepare_rip,
+    'build_routing_table': prepare_build_routing_table,
+    'build_graph_and_paths': prepare_build_graph_and_paths,
+    'kruskal': prepare_kruskal,
+    'bgp': prepare_bgp,
+}
+
+# Tasapisteitä täynnä olevat verkot (painot 1..max_weight): Dialin kauhajonon ja keon dist- ja
+# prev-taulukoiden on oltava identtiset, jotta reititystaulut pysyvät samoina jonosta riippumatta.
+# Palauttaa erimielisten lähteiden määrän.
+def check_dial(sizes, seed=42, graphs=20, max_weight=4):
+    ospf = _module('1')
+    mismatches = 0
+    for size in sizes:
+        for g in range(graphs):
+            rng = random.Random(seed + g)
+            num_nodes, links = random_topology(size, rng)
+            links = [(u, v, rng.randint(1, max_weight)) for u, v, _ in links]
+            csr = ospf.csr_from_links(num_nodes, links)
+            dial = ospf.dial_buckets(csr)
+            if dial is None:
+                # Ei linkkejä: dijkstra_csr käyttää kekoa, joten vertailtavaa ei ole
+                continue
+            for source in range(num_nodes):
+                if ospf.dial_dijkstra_csr(csr, source, *dial) != ospf.heap_dijkstra_csr(csr, source):
+                    mismatches += 1
+    return mismatches
+
+# NumPy-RIP (rip_simulation_vectorized) vs. rip_simulation samoilla tasapelisillä verkoilla, sekä täydellä
+# että laukaistulla päivityksellä: kustannusten, seuraavien hyppyjen ja tulostettujen kierrosten määrän on
+# oltava samat, ja jokaisen seuraavan hypyn on oltava naapuri, jonka kautta kustannus täsmää
+# (cost[s][d] == cost[s][hop] + cost[hop][d]). Palauttaa virheellisten ajojen määrän.
+def check_rip(sizes, seed=42, graphs=20, max_weight=4):
+    rip = _module('2')
+    failures = 0
+    for size in sizes:
+        for g in range(graphs):
+            rng = random.Random(seed + g)
+            num_nodes, links = random_topology(size, rng)
+            links = [(u, v, rng.randint(1, max_weight)) for u, v, _ in links]
+            neighbors = [set() for _ in range(num_nodes)]
+            for u, v, _ in links:
+                neighbors[u].add(v)
+                neighbors[v].add(u)
+            for triggered in (False, True):
+                with contextlib.redirect_stdout(io.StringIO()) as out:
+                    cost, next_hop = rip.table_arrays(rip.rip_simulation(num_nodes, links, triggered))
+                rounds = out.getvalue().count("RIP-kierros")
+                with contextlib.redirect_stdout(io.StringIO()) as out:
+                    fast_cost, fast_hop = rip.rip_simulation_vectorized(num_nodes, links, triggered)
+                fast_rounds = out.getvalue().count("RIP-kierros")
+                ok = rounds == fast_rounds and list(cost) == fast_cost.tolist() and list(next_hop) == fast_hop.tolist()
+                for s in range(num_nodes):
+                    row = s * num_nodes
+                    for d in range(num_nodes):
+                        hop = fast_hop[row + d]
+                        if s == d or fast_cost[row + d] == math.inf:
+                            continue
+                        if hop not in neighbors[s] or \
+                                fast_cost[row + d] != fast_cost[row + hop] + fast_cost[hop * num_nodes + d]:
+                            ok = False
+                failures += not ok
+    return failures
+
+def measure(run, repeat, memory=True):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        # Muistin seuranta hidastaa ajoa, joten huippumuisti mitataan erillisellä ajolla
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return times, peak
+
+def run_benchmarks(sizes, topologies, algorithms, repeat=3, seed=42, memory=True):
+    results = []
+    for topology in topologies:
+        for size in sizes:
+            num_nodes, links = TOPOLOGIES[topology](size, random.Random(seed))
+            for algorithm in algorithms:
+                run = ALGORITHMS[algorithm](num_nodes, links)
+                times, peak = measure(run, repeat, memory)
+                best = min(times)
+                results.append({
+                    'topology': topology,
+                    'nodes': num_nodes,
+                    'links': len(links),
+                    'algorithm': algorithm,
+                    'seconds_min': best,
+                    'seconds_median': statistics.median(times),
+                    'peak_memory_bytes': peak,
+                    'nodes_per_second': num_nodes / best if best > 0 else None,
+                })
+                print(f"{topology:>10} n={num_nodes:<7} {algorithm:<22} {best:.4f} s", file=sys.stderr)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reititysalgoritmien suorituskykymittaukset")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 400])
+    parser.add_argument('--topologies', nargs='+', choices=sorted(TOPOLOGIES), default=sorted(TOPOLOGIES))
+    parser.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS), default=list(ALGORITHMS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help="ohita huippumuistin mittaus")
+    parser.add_argument('--output', help="JSON-tiedosto (oletus: vakiotuloste)")
+    parser.add_argument('--check-dial', action='store_true',
+                        help="vertaa kauhajonon ja keon tuloksia (dist ja prev) mittausten sijaan")
+    parser.add_argument('--check-rip', action='store_true',
+                        help="vertaa NumPy-RIP:iä rip_simulation-funktioon mittausten sijaan")
+    args = parser.parse_args(argv)
+
+    if args.check_dial:
+        mismatches = check_dial(args.sizes, args.seed)
+        print(f"Kauhajono vs. keko: {mismatches} erimielistä lähdettä")
+        sys.exit(1 if mismatches else 0)
+    if args.check_rip:
+        if _module('2').np is None:
+            sys.exit("NumPy puuttuu: rip_simulation_vectorized ei ole käytettävissä")
+        failures = check_rip(args.sizes, args.seed)
+        print(f"NumPy-RIP vs. rip_simulation: {failures} poikkeavaa ajoa")
+        sys.exit(1 if failures else 0)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': run_benchmarks(args.sizes, args.topologies, args.algorithms,
+                                  args.repeat, args.seed, not args.no_memory),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
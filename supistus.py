@@ -0,0 +1,192 @@
+# Supistushierarkia (contraction hierarchy) toistuville lähde–kohde-kyselyille muuttumattomassa verkossa.
+#
+# Esilaskennassa solmut supistetaan yksi kerrallaan tärkeysjärjestyksessä: kun solmu v poistetaan,
+# sen naapureiden u ja x välille lisätään oikopolku (paino w(u,v) + w(v,x), keskisolmu v), ellei
+# rajattu todistajahaku löydä yhtä lyhyttä reittiä v:n ohi. Jokaiselle solmulle tallennetaan vain
+# kaaret supistushetken naapureihin eli ylempiarvoisiin solmuihin, joten muistia kuluu
+# linkkien ja oikopolkujen määrän verran eikä reitittimien määrän neliön verran.
+#
+# Kysely on kaksisuuntainen Dijkstra, joka kulkee molemmista päistä vain ylöspäin; oikopolut
+# puretaan alkuperäisiksi linkeiksi keskisolmujen avulla.
+import heapq
+from array import array
+from collections import namedtuple
+
+from valimuisti import arrays_key, cache_path, load_arrays, save_arrays
+
+# Todistajahaun asettamien solmujen enimmäismäärä: pienempi raja nopeuttaa esilaskentaa,
+# mutta voi lisätä tarpeettomia oikopolkuja (tulos on silti oikea)
+WITNESS_LIMIT = 50
+
+# Solmun v ylöspäin vievät kaaret ovat targets[offsets[v]:offsets[v+1]]; middle = -1 alkuperäiselle linkille
+ContractionHierarchy = namedtuple('ContractionHierarchy', ['rank', 'offsets', 'targets', 'weights', 'middle'])
+
+# Lyhimmät etäisyydet u:sta ohittaen solmun v; haku lopetetaan, kun kaikki kohteet on asetettu
+# tai raja tai asetettujen solmujen enimmäismäärä täyttyy. Palautetut etäisyydet ovat todellisten
+# polkujen pituuksia, joten ne kelpaavat todistajiksi.
+def _witness_search(adj, u, v, targets, limit):
+    inf = float('inf')
+    dist = {u: 0}
+    queue = [(0, u)]
+    settled = 0
+    remaining = len(targets)
+    while queue and settled < WITNESS_LIMIT:
+        d, x = heapq.heappop(queue)
+        if d > limit:
+            break
+        if d > dist[x]:
+            continue
+        settled += 1
+        if x in targets:
+            remaining -= 1
+            if not remaining:
+                break
+        for y, (w, _) in adj[x].items():
+            alt = d + w
+            if alt <= limit and y != v and alt < dist.get(y, inf):
+                dist[y] = alt
+                heapq.heappush(queue, (alt, y))
+    return dist
+
+# Oikopolut, jotka v:n supistaminen vaatii: [(u, x, paino), ...]
+def _shortcuts(adj, v):
+    inf = float('inf')
+    neighbors = list(adj[v].items())
+    shortcuts = []
+    for i, (u, (wu, _)) in enumerate(neighbors[:-1]):
+        rest = neighbors[i + 1:]
+        targets = {x for x, _ in rest}
+        dist = _witness_search(adj, u, v, targets, wu + max(wx for _, (wx, _) in rest))
+        for x, (wx, _) in rest:
+            if dist.get(x, inf) > wu + wx:
+                shortcuts.append((u, x, wu + wx))
+    return shortcuts
+
+def build_contraction_hierarchy(num_nodes, links):
+    # adj[u][v] = (paino, keskisolmu) jäljellä olevassa verkossa
+    adj = [{} for _ in range(num_nodes)]
+    for u, v, w in links:
+        if v not in adj[u] or w < adj[u][v][0]:
+            adj[u][v] = adj[v][u] = (w, -1)
+
+    # Tärkeys: oikopolkujen määrä miinus aste plus jo supistettujen naapureiden määrä.
+    # Jonon arvot päivitetään laiskasti: solmu supistetaan vasta, kun sen ajantasainen arvo on pienin.
+    # Oikopolut lasketaan aina uudelleen juuri ennen supistusta, koska aiemmin löydetty todistaja
+    # on voinut kulkea sittemmin supistetun solmun kautta.
+    deleted = [0] * num_nodes
+    queue = [(len(_shortcuts(adj, v)) - len(adj[v]), v) for v in range(num_nodes)]
+    heapq.heapify(queue)
+    rank = array('q', [0]) * num_nodes
+    upward = [None] * num_nodes
+    next_rank = 0
+    while queue:
+        _, v = heapq.heappop(queue)
+        shortcuts = _shortcuts(adj, v)
+        priority = len(shortcuts) - len(adj[v]) + deleted[v]
+        if queue and priority > queue[0][0]:
+            heapq.heappush(queue, (priority, v))
+            continue
+        upward[v] = adj[v]
+        adj[v] = {}
+        for u in upward[v]:
+            del adj[u][v]
+            deleted[u] += 1
+        for u, x, w in shortcuts:
+            if x not in adj[u] or w < adj[u][x][0]:
+                adj[u][x] = adj[x][u] = (w, v)
+        rank[v] = next_rank
+        next_rank += 1
+
+    offsets = array('q', [0])
+    targets = array('q')
+    weight_list = []
+    middle = array('q')
+    for v in range(num_nodes):
+        for u, (w, m) in upward[v].items():
+            targets.append(u)
+            weight_list.append(w)
+            middle.append(m)
+        offsets.append(len(targets))
+    weights = array('q', weight_list) if all(isinstance(w, int) for w in weight_list) else array('d', weight_list)
+    return ContractionHierarchy(rank, offsets, targets, weights, middle)
+
+# Hierarkia välimuistin kautta; avaimena linkkilistan tiiviste, joten muuttunut verkko laskee uuden hierarkian
+def cached_hierarchy(num_nodes, links, cache=True):
+    if not cache:
+        return build_contraction_hierarchy(num_nodes, links)
+    flat = array('d')
+    for link in links:
+        flat.extend(link)
+    path = cache_path(arrays_key(num_nodes.to_bytes(8, 'little'), flat), 'supistus')
+    cached = load_arrays(path)
+    if cached is not None:
+        return ContractionHierarchy(**cached[1])
+    ch = build_contraction_hierarchy(num_nodes, links)
+    save_arrays(path, num_nodes, **ch._asdict())
+    return ch
+
+def _middle(ch, a, b):
+    low, high = (a, b) if ch.rank[a] < ch.rank[b] else (b, a)
+    for i in range(ch.offsets[low], ch.offsets[low + 1]):
+        if ch.targets[i] == high:
+            return ch.middle[i]
+    raise KeyError((a, b))
+
+# Palauttaa (etäisyys, polku) tai (inf, []), jos kohdetta ei saavuteta
+def ch_shortest_path(ch, start, end):
+    inf = float('inf')
+    if start == end:
+        return 0, [start]
+    offsets, targets, weights = ch.offsets, ch.targets, ch.weights
+    heappop, heappush = heapq.heappop, heapq.heappush
+    dist = ({start: 0}, {end: 0})
+    prev = ({start: None}, {end: None})
+    queues = ([(0, start)], [(0, end)])
+    best, meet = inf, None
+
+    while queues[0] or queues[1]:
+        side = 0 if queues[0] and (not queues[1] or queues[0][0][0] <= queues[1][0][0]) else 1
+        d, u = heappop(queues[side])
+        if d >= best:
+            # Tämän suunnan loput solmut eivät voi enää parantaa reittiä
+            queues[side].clear()
+            continue
+        own, other = dist[side], dist[1 - side]
+        if d > own[u]:
+            continue
+        if u in other and d + other[u] < best:
+            best, meet = d + other[u], u
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            alt = d + weights[i]
+            if alt < own.get(v, inf):
+                own[v] = alt
+                prev[side][v] = u
+                heappush(queues[side], (alt, v))
+
+    if meet is None:
+        return inf, []
+
+    # Ylöspäin kulkeva polku start -> meet <- end, sitten oikopolkujen purku
+    up_path = []
+    node = meet
+    while node is not None:
+        up_path.append(node)
+        node = prev[0][node]
+    up_path.reverse()
+    node = prev[1][meet]
+    while node is not None:
+        up_path.append(node)
+        node = prev[1][node]
+
+    path = [start]
+    stack = list(zip(up_path, up_path[1:]))[::-1]
+    while stack:
+        a, b = stack.pop()
+        m = _middle(ch, a, b)
+        if m < 0:
+            path.append(b)
+        else:
+            stack.append((m, b))
+            stack.append((a, m))
+    return best, path
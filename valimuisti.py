@@ -0,0 +1,110 @@
+# Binäärinen välimuisti jäsennetylle topologialle ja lasketuille reititystauluille.
+# Avaimena on lähdetiedoston (verkko.txt) tai topologiataulukoiden SHA-256-tiiviste, joten
+# muuttunut verkko ei koskaan käytä vanhoja tuloksia.
+#
+# Tiedostomuoto (little-endian):
+#   otsake:   b'RTVM', versio (u32), reitittimien määrä (u64), taulukoiden määrä (u32)
+#   hakemisto: jokaiselle taulukolle nimi (16 tavua), array-moduulin tyyppikoodi (1 tavu),
+#              alkioiden määrä (u64) ja siirtymä tiedoston alusta (u64)
+#   data:     taulukot peräkkäin 8 tavun rajoille tasattuina
+# Luettaessa tiedosto avataan mmap:llä ja taulukot palautetaan kopioimattomina memoryview-näkyminä
+# (NumPy: np.frombuffer(näkymä) tai numpy.memmap samalla siirtymällä).
+import hashlib
+import mmap
+import os
+import struct
+from pathlib import Path
+
+from verkkolukija import read_network_arrays
+
+MAGIC = b'RTVM'
+VERSION = 1
+CACHE_DIR = Path(".reititys_cache")
+
+_HEADER = struct.Struct('<4sIQI')
+_ENTRY = struct.Struct('<16scQQ')
+
+def file_key(filename):
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+# Avain muistissa olevalle topologialle (esim. 1.py:n syötetty verkko); osat ovat tavupuskureita
+def arrays_key(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(len(memoryview(part).cast('B')).to_bytes(8, 'little'))
+        h.update(part)
+    return h.hexdigest()
+
+def cache_path(key, kind, directory=CACHE_DIR):
+    return Path(directory) / f"{key}.{kind}.bin"
+
+def save_arrays(path, num_routers, **arrays):
+    path = Path(path)
+    offset = _HEADER.size + _ENTRY.size * len(arrays)
+    entries = []
+    for name, values in arrays.items():
+        offset = (offset + 7) & ~7
+        entries.append((name, values, offset))
+        offset += len(values) * values.itemsize
+
+    tmp = path.with_suffix('.tmp')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, num_routers, len(entries)))
+            for name, values, offset in entries:
+                f.write(_ENTRY.pack(name.encode(), values.typecode.encode(), len(values), offset))
+            for name, values, offset in entries:
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(values)
+        os.replace(tmp, path)
+    except OSError:
+        # Välimuisti on vain nopeutus: kirjoitusvirhe ei saa kaataa ajoa
+        return False
+    return True
+
+# Palauttaa (reitittimien määrä, {nimi: memoryview}) tai None, jos välimuistia ei ole tai se on vanhaa muotoa
+def load_arrays(path):
+    try:
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mm) < _HEADER.size:
+        return None
+    magic, version, num_routers, count = _HEADER.unpack_from(mm, 0)
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    view = memoryview(mm)
+    arrays = {}
+    for i in range(count):
+        name, typecode, length, offset = _ENTRY.unpack_from(mm, _HEADER.size + i * _ENTRY.size)
+        typecode = typecode.decode()
+        size = struct.calcsize(typecode)
+        if offset + length * size > len(mm):
+            return None
+        arrays[name.rstrip(b'\0').decode()] = view[offset:offset + length * size].cast(typecode)
+    return num_routers, arrays
+
+# verkkolukija.read_network_arrays välimuistin kautta; välimuistista luettaessa hylättyjä rivejä ei raportoida uudelleen
+def cached_network_arrays(filename="verkko.txt", key=None):
+    key = key or file_key(filename)
+    path = cache_path(key, 'topologia')
+    cached = load_arrays(path)
+    if cached is not None:
+        num_routers, arrays = cached
+        return num_routers, arrays['u'], arrays['v'], arrays['cost'], []
+    num_routers, us, vs, costs, rejected = read_network_arrays(filename)
+    save_arrays(path, num_routers, u=us, v=vs, cost=costs)
+    return num_routers, us, vs, costs, rejected
+
+def cached_network_from_file(filename="verkko.txt", rejected=None, key=None):
+    num_routers, us, vs, costs, bad_lines = cached_network_arrays(filename, key)
+    if rejected is not None:
+        rejected.extend(bad_lines)
+    return num_routers, list(zip(us, vs, costs))
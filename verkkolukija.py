@@ -0,0 +1,157 @@
+# Yhteinen verkkotiedoston lukija (verkko.txt-muoto), jota 2.py, 6.py ja 7.py käyttävät.
+# Ensimmäinen rivi: "<reitittimet> <linkit>", sen jälkeen linkkirivit "<u> <v> <paino>".
+import warnings
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNK_BYTES = 1 << 23
+
+# Tunnisteet ja painot tallennetaan array('q')-taulukoihin
+INT64_MIN, INT64_MAX = -1 << 63, (1 << 63) - 1
+
+def _decode(line):
+    return line.decode(errors='replace').strip()
+
+# Pilkkoo tiedoston rivinvaihtoon päättyviksi lohkoiksi, enintään num_links riviä yhteensä.
+# Tuottaa (lohko, rivien määrä).
+def _read_blocks(f, num_links):
+    remaining = num_links
+    carry = b''
+    while remaining > 0:
+        block = f.read(CHUNK_BYTES)
+        data = carry + block
+        if block:
+            cut = data.rfind(b'\n') + 1
+            data, carry = data[:cut], data[cut:]
+        elif data and not data.endswith(b'\n'):
+            data += b'\n'
+        count = data.count(b'\n')
+        if count > remaining:
+            data = b'\n'.join(data.split(b'\n', remaining)[:remaining]) + b'\n'
+            count = remaining
+        if count:
+            remaining -= count
+            yield data, count
+        if not block:
+            break
+
+# Rivi kerrallaan; käytetään ilman NumPyä ja lohkoille, joissa on muotoiluvirheitä
+def _parse_lines(data, line_no, num_routers, us, vs, costs, line_nos, rejected):
+    for line in data.split(b'\n')[:-1]:
+        line_no += 1
+        parts = line.split()
+        if len(parts) != 3:
+            rejected.append((line_no, _decode(line), "väärä kenttien määrä"))
+            continue
+        try:
+            u, v, cost = int(parts[0]), int(parts[1]), int(parts[2])
+        except ValueError:
+            rejected.append((line_no, _decode(line), "ei kokonaisluku"))
+            continue
+        if u == v or cost <= 0 or cost > INT64_MAX or u < 0 or v < 0 or u >= num_routers or v >= num_routers \
+                or max(u, v) > INT64_MAX:
+            rejected.append((line_no, _decode(line), "virheellinen linkki"))
+            continue
+        us.append(u)
+        vs.append(v)
+        costs.append(cost)
+        line_nos.append(line_no)
+
+# Koko lohko kerralla NumPy-taulukoiksi; palauttaa False, jos jollakin rivillä ei ole
+# täsmälleen kolmea kokonaislukua (silloin lohko luetaan rivi kerrallaan)
+def _parse_block_numpy(data, count, line_no, num_routers, us, vs, costs, line_nos, rejected):
+    buf = np.frombuffer(data, dtype=np.uint8)
+    space = buf <= 32
+    token_starts = np.flatnonzero(~space & np.concatenate(([True], space[:-1])))
+    newlines = np.flatnonzero(buf == 10)
+    if (np.bincount(np.searchsorted(newlines, token_starts), minlength=count) != 3).any():
+        return False
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            values = np.fromstring(data, dtype=np.int64, sep=' ')
+    except (ValueError, DeprecationWarning):
+        return False
+    if len(values) != 3 * count:
+        return False
+    # fromstring leikkaa int64-alueen ylittävät luvut ääriarvoihin; ne tarkistetaan rivi kerrallaan
+    if ((values == INT64_MAX) | (values == INT64_MIN)).any():
+        return False
+    values = values.reshape(-1, 3)
+    u, v, cost = values[:, 0], values[:, 1], values[:, 2]
+    valid = (u != v) & (cost > 0) & (u >= 0) & (v >= 0) & (u < num_routers) & (v < num_routers)
+    if not valid.all():
+        lines = data.split(b'\n')
+        for i in np.flatnonzero(~valid).tolist():
+            rejected.append((line_no + 1 + i, _decode(lines[i]), "virheellinen linkki"))
+    us.frombytes(u[valid].tobytes())
+    vs.frombytes(v[valid].tobytes())
+    costs.frombytes(cost[valid].tobytes())
+    line_nos.frombytes(np.arange(line_no + 1, line_no + 1 + count, dtype=np.int64)[valid].tobytes())
+    return True
+
+# Suuntaamattomista kaksoislinkeistä säilytetään ensimmäinen, muut lisätään hylättyihin
+def _drop_duplicates(us, vs, costs, line_nos, num_routers, rejected):
+    if np is not None:
+        u, v, cost, numbers = (np.frombuffer(a, dtype=np.int64) for a in (us, vs, costs, line_nos))
+        keys = np.minimum(u, v) * num_routers + np.maximum(u, v)
+        _, first = np.unique(keys, return_index=True)
+        if len(first) == len(keys):
+            return us, vs, costs
+        keep = np.zeros(len(keys), dtype=bool)
+        keep[first] = True
+        for i in np.flatnonzero(~keep).tolist():
+            rejected.append((int(numbers[i]), f"{u[i]} {v[i]} {cost[i]}", "kaksoislinkki"))
+        return tuple(array('q', a[keep].tobytes()) for a in (u, v, cost))
+
+    seen = set()
+    kept = array('q'), array('q'), array('q')
+    for i, (u, v, cost) in enumerate(zip(us, vs, costs)):
+        key = u * num_routers + v if u < v else v * num_routers + u
+        if key in seen:
+            rejected.append((line_nos[i], f"{u} {v} {cost}", "kaksoislinkki"))
+            continue
+        seen.add(key)
+        kept[0].append(u)
+        kept[1].append(v)
+        kept[2].append(cost)
+    return kept
+
+# Lukee verkon lohkoittain suoraan kokonaislukutaulukoihin (u, v, paino).
+# Hylätyt rivit palautetaan listana (rivinumero, rivi, syy) rivinumeron mukaan järjestettynä.
+def read_network_arrays(filename="verkko.txt"):
+    us, vs, costs, line_nos = array('q'), array('q'), array('q'), array('q')
+    rejected = []
+    with open(filename, 'rb') as f:
+        first_line = f.readline().split()
+        num_routers, num_links = int(first_line[0]), int(first_line[1])
+        line_no = 1
+        for data, count in _read_blocks(f, num_links):
+            args = (line_no, num_routers, us, vs, costs, line_nos, rejected)
+            if np is None or not _parse_block_numpy(data, count, *args):
+                _parse_lines(data, *args)
+            line_no += count
+
+    us, vs, costs = _drop_duplicates(us, vs, costs, line_nos, num_routers, rejected)
+    rejected.sort()
+    return num_routers, us, vs, costs, rejected
+
+# Sama tulos linkkilistana [(u, v, paino), ...], kuten aiemmat tiedostokohtaiset lukijat
+def read_network_from_file(filename="verkko.txt", rejected=None):
+    num_routers, us, vs, costs, bad_lines = read_network_arrays(filename)
+    if rejected is not None:
+        rejected.extend(bad_lines)
+    return num_routers, list(zip(us, vs, costs))
+
+def print_rejected(rejected, limit=5):
+    if not rejected:
+        return
+    print(f"⚠️ Hylättiin {len(rejected)} riviä:")
+    for line_no, line, reason in rejected[:limit]:
+        print(f" - rivi {line_no}: '{line}' ({reason})")
+    if len(rejected) > limit:
+        print(f" - ... ja {len(rejected) - limit} muuta")
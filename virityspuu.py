@@ -0,0 +1,266 @@
+# Dynaaminen minimivirittävä metsä (esim. STP-mallin puu), jota päivitetään linkkimuutos kerrallaan.
+#
+# Puu tallennetaan vanhempiosoittimina: parent[x] on x:n vanhempi (-1 = juuri), up_weight[x] linkin
+# x–parent[x] paino ja depth[x] syvyys. Syvyydet ovat yhtenäisiä puun sisällä, joten kahden solmun
+# välinen puupolku löytyy nousemalla syvemmästä päästä kohti yhteistä esivanhempaa. Puun läpikäyntejä
+# varten pidetään lisäksi suuntaamattomat puulinkit (tree_adj), joihin uudelleenjuurrutus ei koske.
+#
+# - Lisäys: jos päät ovat eri puissa, puut yhdistetään; muuten puupolun raskain linkki vaihdetaan
+#   uuteen, jos uusi on kevyempi (syklin maksimi).
+# - Poisto: puulinkin poisto jakaa puun kahtia; pienemmän puolen solmuista lähtevistä linkeistä
+#   kevyin yhdistää puolet uudelleen (korvaava linkki).
+# - Painon muutos: puulinkin kevennys ja muun linkin raskautus eivät muuta puuta; muut käsitellään
+#   kuten poisto ja lisäys.
+#
+# Puun yhdistämisessä pienempi puu juurrutetaan uudelleen liitoskohdasta. Pienempi puoli löydetään
+# käymällä molempia puolia läpi vuorotellen, joten työ on verrannollinen pienemmän puolen kokoon.
+import importlib
+from array import array
+from collections import deque, namedtuple
+
+TreeChange = namedtuple('TreeChange', ['added', 'removed'])  # linkit (u, v, paino) tai None
+
+# Tapahtumatiedoston rivit: "+ u v paino" lisää linkin, "- u v" poistaa ja "= u v paino" muuttaa painon
+EVENT_ARGUMENTS = {'+': 3, '-': 2, '=': 3}
+
+class DynamicSpanningTree:
+    """Minimivirittävä metsä solmuille 0..num_nodes-1; alkutila lasketaan Kruskalilla."""
+
+    def __init__(self, num_nodes, us=(), vs=(), weights=()):
+        self.num_nodes = num_nodes
+        self.adj = [{} for _ in range(num_nodes)]  # kaikki linkit: adj[u][v] = paino
+        self.tree_adj = [set() for _ in range(num_nodes)]
+        self.parent = array('q', [-1]) * num_nodes
+        self.up_weight = [0] * num_nodes
+        self.depth = array('q', bytes(8 * num_nodes))
+        self.total_weight = 0
+        self.tree_links = 0
+        for u, v, w in zip(us, vs, weights):
+            self.adj[u][v] = self.adj[v][u] = w
+
+        kruskal_arrays = importlib.import_module('9').kruskal_arrays
+        tree_adj = self.tree_adj
+        for i in kruskal_arrays(num_nodes, us, vs, weights):
+            u, v, w = us[i], vs[i], weights[i]
+            tree_adj[u].add(v)
+            tree_adj[v].add(u)
+            self.total_weight += w
+            self.tree_links += 1
+        # Vanhempiosoittimet leveyshaulla jokaisen puun mielivaltaisesta juuresta
+        seen = bytearray(num_nodes)
+        for root in range(num_nodes):
+            if seen[root]:
+                continue
+            seen[root] = 1
+            queue = deque([root])
+            while queue:
+                x = queue.popleft()
+                for y in tree_adj[x]:
+                    if not seen[y]:
+                        seen[y] = 1
+                        self.parent[y] = x
+                        self.up_weight[y] = self.adj[x][y]
+                        self.depth[y] = self.depth[x] + 1
+                        queue.append(y)
+
+    def _check(self, u, v):
+        if u == v or not (0 <= u < self.num_nodes and 0 <= v < self.num_nodes):
+            raise ValueError(f"virheellinen linkki {u} <--> {v}")
+
+    def is_tree_link(self, u, v):
+        return v in self.tree_adj[u]
+
+    # Puun solmut leveyshakujärjestyksessä: [(solmu, edeltäjä haussa)]
+    def _walk(self, start):
+        tree_adj = self.tree_adj
+        order = [(start, -1)]
+        for x, previous in order:
+            for y in tree_adj[x]:
+                if y != previous:
+                    order.append((y, x))
+        return order
+
+    # Käy a:n ja b:n puita läpi vuorotellen solmu kerrallaan; palauttaa ensin loppuun käydyn puun
+    # solmut ja aloitussolmun
+    def _smaller_side(self, a, b):
+        tree_adj = self.tree_adj
+        sides = ([a], [b])
+        previous = ([-1], [-1])
+        i = 0
+        while True:
+            for side in (0, 1):
+                nodes = sides[side]
+                if i == len(nodes):
+                    return nodes, (a, b)[side]
+                x, before = nodes[i], previous[side][i]
+                for y in tree_adj[x]:
+                    if y != before:
+                        nodes.append(y)
+                        previous[side].append(x)
+            i += 1
+
+    # Juurruttaa x:n puun uudelleen x:ään ja liittää sen solmun y alle linkillä, jonka paino on w
+    def _attach(self, x, y, w):
+        parent, depth, up_weight, adj = self.parent, self.depth, self.up_weight, self.adj
+        for z, previous in self._walk(x):
+            if previous < 0:
+                parent[z], depth[z], up_weight[z] = y, depth[y] + 1, w
+            else:
+                parent[z], depth[z], up_weight[z] = previous, depth[previous] + 1, adj[z][previous]
+        self.tree_adj[x].add(y)
+        self.tree_adj[y].add(x)
+        self.total_weight += w
+        self.tree_links += 1
+
+    def _cut(self, u, v):
+        child = u if self.parent[u] == v else v
+        self.total_weight -= self.up_weight[child]
+        self.tree_links -= 1
+        self.parent[child] = -1
+        self.tree_adj[u].discard(v)
+        self.tree_adj[v].discard(u)
+
+    # Puupolun u–v raskain linkki (paino, lapsisolmu) tai None, jos solmut ovat eri puissa
+    def _path_max(self, u, v):
+        parent, depth, up_weight = self.parent, self.depth, self.up_weight
+        best = None
+        while u != v:
+            if depth[u] < depth[v]:
+                u, v = v, u
+            if parent[u] < 0:
+                return None
+            if best is None or up_weight[u] > best[0]:
+                best = (up_weight[u], u)
+            u = parent[u]
+        return best
+
+    # Yhdistää puun kahtia jaetut puolet u ja v kevyimmällä niiden välisellä linkillä, jos sellainen on
+    def _reconnect(self, u, v):
+        side, _ = self._smaller_side(u, v)
+        members = set(side)
+        best = None
+        for x in side:
+            for y, w in self.adj[x].items():
+                if y not in members and (best is None or w < best[0]):
+                    best = (w, x, y)
+        if best is None:
+            return None
+        w, x, y = best
+        self._attach(x, y, w)
+        return (x, y, w)
+
+    def add_link(self, u, v, w):
+        """Lisää linkin; palauttaa puun muutoksen (TreeChange) tai None."""
+        self._check(u, v)
+        if v in self.adj[u]:
+            raise ValueError(f"linkki {u} <--> {v} on jo olemassa")
+        self.adj[u][v] = self.adj[v][u] = w
+        return self._insert(u, v, w)
+
+    def _insert(self, u, v, w):
+        heaviest = self._path_max(u, v)
+        removed = None
+        if heaviest is not None:
+            weight, child = heaviest
+            if w >= weight:
+                return None
+            removed = (child, self.parent[child], weight)
+            self._cut(child, self.parent[child])
+        # Päät ovat nyt eri puissa: pienempi puu juurrutetaan uudelleen ja liitetään suurempaan
+        _, start = self._smaller_side(u, v)
+        if start == u:
+            self._attach(u, v, w)
+        else:
+            self._attach(v, u, w)
+        return TreeChange((u, v, w), removed)
+
+    def remove_link(self, u, v):
+        """Poistaa linkin; puulinkin tilalle haetaan korvaava linkki. Palauttaa TreeChange tai None."""
+        self._check(u, v)
+        if v not in self.adj[u]:
+            raise ValueError(f"linkkiä {u} <--> {v} ei ole")
+        w = self.adj[u].pop(v)
+        del self.adj[v][u]
+        if not self.is_tree_link(u, v):
+            return None
+        self._cut(u, v)
+        return TreeChange(self._reconnect(u, v), (u, v, w))
+
+    def set_cost(self, u, v, w):
+        """Muuttaa linkin painoa; palauttaa TreeChange tai None."""
+        self._check(u, v)
+        if v not in self.adj[u]:
+            raise ValueError(f"linkkiä {u} <--> {v} ei ole")
+        old = self.adj[u][v]
+        self.adj[u][v] = self.adj[v][u] = w
+        if self.is_tree_link(u, v):
+            child = u if self.parent[u] == v else v
+            self.up_weight[child] = w
+            self.total_weight += w - old
+            if w <= old:
+                return None
+            # Raskautunut puulinkki: irrotetaan ja haetaan kevyin yhdistävä linkki (voi olla sama)
+            self._cut(u, v)
+            added = self._reconnect(u, v)
+            if added is not None and {added[0], added[1]} == {u, v}:
+                return None
+            return TreeChange(added, (u, v, old))
+        if w >= old:
+            return None
+        return self._insert(u, v, w)
+
+    def apply(self, op, u, v, w=None):
+        """Yksi tapahtuma: '+' lisää, '-' poistaa, '=' muuttaa painon."""
+        if op == '+':
+            return self.add_link(u, v, w)
+        if op == '-':
+            return self.remove_link(u, v)
+        if op == '=':
+            return self.set_cost(u, v, w)
+        raise ValueError(f"tuntematon tapahtuma {op!r}")
+
+    @property
+    def components(self):
+        return self.num_nodes - self.tree_links
+
+    def tree_edges(self):
+        """Puun linkit (lapsi, vanhempi, paino)."""
+        for x in range(self.num_nodes):
+            if self.parent[x] >= 0:
+                yield x, self.parent[x], self.up_weight[x]
+
+# Lukee tapahtumat rivi kerrallaan: tuottaa (rivinumero, toiminto, u, v, paino tai None);
+# virheelliset rivit lisätään rejected-listaan. Tyhjät ja #-alkuiset rivit ohitetaan.
+def read_events(filename, rejected):
+    with open(filename) as f:
+        for line_no, line in enumerate(f, 1):
+            parts = line.split()
+            if not parts or parts[0].startswith('#'):
+                continue
+            count = EVENT_ARGUMENTS.get(parts[0])
+            if count is None or len(parts) != count + 1:
+                rejected.append((line_no, line.strip(), "tuntematon tapahtuma"))
+                continue
+            try:
+                values = [int(x) for x in parts[1:]]
+            except ValueError:
+                rejected.append((line_no, line.strip(), "ei kokonaisluku"))
+                continue
+            if count == 3 and values[2] <= 0:
+                rejected.append((line_no, line.strip(), "virheellinen paino"))
+                continue
+            yield line_no, parts[0], values[0], values[1], values[2] if count == 3 else None
+
+# Toistaa tapahtumatiedoston puuhun; palauttaa (tapahtumat, puun muutokset)
+def replay_events(tree, filename, rejected):
+    events = changes = 0
+    for line_no, op, u, v, w in read_events(filename, rejected):
+        try:
+            change = tree.apply(op, u, v, w)
+        except ValueError as e:
+            rejected.append((line_no, f"{op} {u} {v}" + (f" {w}" if w is not None else ""), str(e)))
+            continue
+        events += 1
+        if change is not None:
+            changes += 1
+    return events, changes